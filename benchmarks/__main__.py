@@ -0,0 +1,43 @@
+"""运行全部基准测试
+
+用法 (在仓库根目录运行)：
+  python -m benchmarks [--quick] [--only scrapers,storage,charts]
+                       [--save result.json] [--baseline base.json]
+
+先在改动前 --save 一份结果作为 baseline，改动后用 --baseline 对比 p50 延迟
+"""
+
+import argparse
+
+from benchmarks import bench_charts, bench_scrapers, bench_storage
+from benchmarks.harness import load_baseline, print_results, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--quick", action="store_true", help="缩小数据量，快速跑一遍")
+    parser.add_argument("--only", default="scrapers,storage,charts")
+    parser.add_argument("--save", help="把结果保存成 JSON")
+    parser.add_argument("--baseline", help="和之前保存的结果对比")
+    args = parser.parse_args()
+
+    only = set(args.only.split(","))
+    results = []
+    if "scrapers" in only:
+        results += bench_scrapers.run(repeat=5 if args.quick else 20)
+    if "storage" in only:
+        if args.quick:
+            results += bench_storage.run(users=1000, days=365, repeat=2)
+        else:
+            results += bench_storage.run()
+    if "charts" in only:
+        results += bench_charts.run(repeat=3 if args.quick else 10)
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    print_results(results, baseline)
+    if args.save:
+        save_results(args.save, results)
+
+
+if __name__ == "__main__":
+    main()
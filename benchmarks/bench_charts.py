@@ -0,0 +1,33 @@
+"""图表渲染的基准，直接在当前进程里调用 utils.charts (和画图进程里一样)
+
+用法 (在仓库根目录运行)：
+  python -m benchmarks.bench_charts
+"""
+
+import datetime
+import random
+
+from benchmarks.harness import measure, print_results
+
+
+def run(repeat=10):
+    from utils import charts
+
+    charts.init_worker()
+    rng = random.Random(0)
+    rank = [(f"user{i}", rng.randint(0, 100)) for i in range(10)]
+    start = datetime.date(2025, 1, 1)
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(365)]
+    rps = [rng.randint(0, 100) for _ in dates]
+    return [
+        measure("plot_rank top 10", lambda: charts.plot_rank(rank), repeat=repeat),
+        measure(
+            "plot_history 365 days",
+            lambda: charts.plot_history(dates, rps, "bench"),
+            repeat=repeat,
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    print_results(run())
@@ -0,0 +1,40 @@
+"""比较 lentille-context 两种提取方式的耗时
+
+用法 (在仓库根目录运行)：
+  python -m benchmarks.bench_luogu_extract [page.html ...]
+
+不传参数时读取 benchmarks/fixtures/luogu/*.html，
+目录为空时用一个模拟的洛谷文章列表页代替。
+"""
+
+import sys
+import time
+
+from benchmarks.fixtures import load_luogu_pages
+from utils.scrapers import extract_lentille_context, parse_luogu_context_soup
+
+
+def bench(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv):
+    repeat = 50
+    pages = load_luogu_pages(argv)
+    print(f"{'page':<24}{'size':>10}{'soup (ms)':>12}{'fast (ms)':>12}{'speedup':>10}")
+    for name, html in pages:
+        # 两种方式结果必须一致
+        assert extract_lentille_context(html) == parse_luogu_context_soup(html), name
+        soup_t = bench(parse_luogu_context_soup, html, repeat)
+        fast_t = bench(extract_lentille_context, html, repeat)
+        print(
+            f"{name:<24}{len(html):>10}{soup_t * 1000:>12.3f}"
+            f"{fast_t * 1000:>12.3f}{soup_t / fast_t:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
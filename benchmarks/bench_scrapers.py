@@ -0,0 +1,112 @@
+"""RSS / 洛谷解析的基准：页面由本地 FixtureServer 提供，不访问外网
+
+用法 (在仓库根目录运行)：
+  python -m benchmarks.bench_scrapers
+"""
+
+import asyncio
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.fixtures import load_feeds, load_luogu_pages
+from benchmarks.harness import measure, print_results
+from utils.http_client import HttpClient
+from utils.luogu_client import LuoguClient
+from utils.scrapers import parse_luogu_articles, parse_luogu_context, parse_rss
+
+
+def never_seen(link):
+    return False
+
+
+def run(repeat=20):
+    feeds = load_feeds()
+    pages = load_luogu_pages()
+    routes = {f"/rss/{name}": (body, "application/xml") for name, body in feeds.items()}
+    routes.update(
+        {f"/luogu/{name}": (html.encode("utf-8"), "text/html") for name, html in pages}
+    )
+
+    results = []
+    with FixtureServer(routes) as server:
+        for name in feeds:
+            url = server.url(f"/rss/{name}")
+            _, articles = parse_rss(url, never_seen, 0)
+            # 每次都是全新的 cache：完整下载 + 解析
+            results.append(
+                measure(
+                    f"parse_rss[{name}] full",
+                    lambda: parse_rss(url, never_seen, 0, cache={}),
+                    repeat=repeat,
+                    items=len(articles),
+                )
+            )
+            # 复用 cache：服务器返回 304，不解析 XML
+            cache = {}
+            parse_rss(url, never_seen, 0, cache=cache)
+            results.append(
+                measure(
+                    f"parse_rss[{name}] not modified",
+                    lambda: parse_rss(url, never_seen, 0, cache=cache),
+                    repeat=repeat,
+                )
+            )
+            # 全部已读：增量解析读到前几篇就停，对比 feedparser 完整解析
+            seen = {a["link"] for a in articles}
+            for mode, streaming in (("streaming", True), ("feedparser", False)):
+                results.append(
+                    measure(
+                        f"parse_rss[{name}] all seen, {mode}",
+                        lambda: parse_rss(
+                            url, seen.__contains__, 0, cache={}, streaming=streaming
+                        ),
+                        repeat=repeat,
+                    )
+                )
+
+        for name, html in pages:
+            count = len(parse_luogu_articles(parse_luogu_context(html), never_seen, 0))
+            results.append(
+                measure(
+                    f"parse_luogu[{name}]",
+                    lambda: parse_luogu_articles(
+                        parse_luogu_context(html), never_seen, 0
+                    ),
+                    repeat=repeat,
+                    items=count,
+                )
+            )
+        results.extend(_bench_luogu_client(server, pages, repeat))
+    return results
+
+
+def _bench_luogu_client(server, pages, repeat):
+    """LuoguClient 的异步抓取 + 解析，走和 bot 相同的连接池"""
+    loop = asyncio.new_event_loop()
+    http = HttpClient()
+    loop.run_until_complete(http.start())
+    client = LuoguClient(http)
+
+    async def fetch(url):
+        html = await client.get_text(url)
+        return parse_luogu_articles(parse_luogu_context(html), never_seen, 0)
+
+    results = []
+    try:
+        for name, _ in pages:
+            url = server.url(f"/luogu/{name}")
+            results.append(
+                measure(
+                    f"luogu fetch+parse[{name}]",
+                    lambda: loop.run_until_complete(fetch(url)),
+                    repeat=repeat,
+                )
+            )
+    finally:
+        loop.run_until_complete(client.close())
+        loop.run_until_complete(http.close())
+        loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    print_results(run())
@@ -0,0 +1,116 @@
+"""打卡数据的基准：模拟 users 个用户 days 天的打卡记录，测加载、保存和排行查询
+
+用法 (在仓库根目录运行)：
+  python -m benchmarks.bench_storage [users] [days] [rate]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.fixtures import make_checkins
+from benchmarks.harness import measure, print_results
+from utils.data_manager import DataManager
+
+
+def _open(data_dir, storage):
+    files = DataManager.default_files(data_dir)
+    return DataManager(
+        url_file=files["seen_url"],
+        luogu_file=files["seen_luogu"],
+        checkin_file=files["checkins"],
+        delivery_file=files["deliveries"],
+        feed_cache_file=files["feed_cache"],
+        poll_schedule_file=files["poll_schedule"],
+        storage=storage,
+        db_file=os.path.join(data_dir, "bot.db"),
+    )
+
+
+def run(users=10000, days=730, rate=0.1, repeat=5):
+    checkins, dates = make_checkins(users, days, rate)
+    records = sum(len(v) for v in checkins.values())
+    print(f"Synthetic check-ins: {len(checkins)} users, {records} records")
+    rng = random.Random(1)
+    uids = list(checkins)
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(DataManager.default_files(data_dir)["checkins"], "w") as f:
+            json.dump(checkins, f)
+        del checkins
+
+        for storage in ("json", "sqlite"):
+            # sqlite 第一次打开时会从 JSON 迁移
+            dm = _open(data_dir, storage)
+            results.append(
+                measure(
+                    f"DataManager load ({storage})",
+                    lambda: _open(data_dir, storage).storage.close(),
+                    repeat=repeat,
+                    warmup=0,
+                    items=records,
+                )
+            )
+
+            def checkin_and_save():
+                dm.add_checkin(rng.choice(uids), dates[0], rng.randint(0, 100))
+
+            # 还没 start() 后台写盘，add_checkin 里的 save() 会同步写入
+            results.append(
+                measure(
+                    f"add_checkin + save ({storage})",
+                    checkin_and_save,
+                    repeat=repeat,
+                )
+            )
+
+            # 后台写盘时事件循环里只做 set + take_pending，write 在线程里
+            def checkin_and_snapshot():
+                uid = rng.choice(uids)
+                dm.storage.set("checkins", (uid, dates[0]), rng.randint(0, 100))
+                dm.storage.take_pending()
+
+            results.append(
+                measure(
+                    f"add_checkin + take_pending ({storage})",
+                    checkin_and_snapshot,
+                    repeat=repeat,
+                )
+            )
+            dm.storage.close()
+
+        dm = _open(data_dir, "json")
+        results.append(
+            measure(
+                "get_day_rank top 10",
+                lambda: dm.get_day_rank(rng.choice(dates), top=10),
+                repeat=1000,
+            )
+        )
+        results.append(
+            measure(
+                "get_day_rank full",
+                lambda: dm.get_day_rank(rng.choice(dates)),
+                repeat=200,
+            )
+        )
+        for span in (7, 30):
+            results.append(
+                measure(
+                    f"get_range_rank {span} days",
+                    lambda: dm.get_range_rank(dates[span - 1], dates[0], top=10),
+                    repeat=20,
+                )
+            )
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    users = int(args[0]) if len(args) > 0 else 10000
+    days = int(args[1]) if len(args) > 1 else 730
+    rate = float(args[2]) if len(args) > 2 else 0.1
+    print_results(run(users, days, rate))
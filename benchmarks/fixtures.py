@@ -0,0 +1,140 @@
+"""基准测试用的数据：优先读取 fixtures/ 下录制的页面，没有时生成模拟数据
+
+录制真实页面见 python -m benchmarks.record_fixtures
+"""
+
+import datetime
+import glob
+import json
+import os
+import random
+from xml.sax.saxutils import escape
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RSS_DIR = os.path.join(FIXTURE_DIR, "rss")
+LUOGU_DIR = os.path.join(FIXTURE_DIR, "luogu")
+
+
+def make_fake_page(articles=10):
+    """模拟洛谷页面：大段 head + 内联脚本 + lentille-context + 页面主体"""
+    result = [
+        {
+            "lid": f"lid{i:05d}",
+            "title": f"文章标题 {i}",
+            "time": 1760000000 + i * 3600,
+            "content": "正文摘要，" * 40,
+        }
+        for i in range(articles)
+    ]
+    ctx = {
+        "data": {
+            "articles": {"perPage": articles, "count": 123, "result": result},
+            "user": {"uid": 1, "name": "benchmark"},
+        }
+    }
+    head = "".join(
+        f'<link rel="stylesheet" href="/static/{i}.css"><meta name="m{i}" content="x">'
+        for i in range(200)
+    )
+    inline = "<script>" + "var a = 1;" * 2000 + "</script>"
+    body = "".join(
+        f'<div class="card"><a href="/article/{i}">item {i}</a></div>'
+        for i in range(500)
+    )
+    return (
+        f"<!DOCTYPE html><html><head>{head}{inline}"
+        f'<script id="lentille-context" type="application/json">'
+        f"{json.dumps(ctx, ensure_ascii=False)}</script>"
+        f"</head><body>{body}</body></html>"
+    )
+
+
+def make_fake_rss(entries=20):
+    """模拟博客园的 RSS 2.0：时间是 ...Z 格式，新文章在前"""
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    items = []
+    for i in range(entries):
+        published = base - datetime.timedelta(hours=6 * i)
+        items.append(
+            "<item>"
+            f"<title>{escape(f'博客文章 {i}')}</title>"
+            f"<link>https://www.cnblogs.com/bench/p/{100000 + i}.html</link>"
+            f"<published>{published.strftime('%Y-%m-%dT%H:%M:%SZ')}</published>"
+            f"<description>{escape('<p>' + '正文内容，' * 200 + '</p>')}</description>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<rss version="2.0"><channel><title>bench - 博客园</title>'
+        "<link>https://www.cnblogs.com/bench/</link>"
+        f"{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def make_fake_atom(entries=20):
+    """模拟静态博客生成的 Atom"""
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    items = []
+    for i in range(entries):
+        published = base - datetime.timedelta(days=i)
+        stamp = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+        items.append(
+            "<entry>"
+            f"<title>{escape(f'Atom 文章 {i}')}</title>"
+            f'<link href="https://blog.example.com/post/{i}/"/>'
+            f"<id>https://blog.example.com/post/{i}/</id>"
+            f"<published>{stamp}</published><updated>{stamp}</updated>"
+            f"<summary type=\"html\">{escape('<p>' + '摘要，' * 100 + '</p>')}</summary>"
+            f"<content type=\"html\">{escape('<p>' + '正文，' * 1500 + '</p>')}</content>"
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom"><title>bench atom</title>'
+        f"{''.join(items)}</feed>"
+    ).encode("utf-8")
+
+
+def _read_dir(directory, pattern, mode):
+    files = {}
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        with open(path, mode) as f:
+            files[os.path.basename(path)] = f.read()
+    return files
+
+
+def load_feeds():
+    """{文件名: RSS/Atom bytes}"""
+    feeds = _read_dir(RSS_DIR, "*.xml", "rb")
+    if not feeds:
+        feeds = {"cnblogs.xml": make_fake_rss(), "atom.xml": make_fake_atom()}
+    return feeds
+
+
+def load_luogu_pages(paths=None):
+    """[(名字, html)]，paths 为空时读取 fixtures/luogu/*.html"""
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append((os.path.basename(path), f.read()))
+        return pages
+    pages = list(_read_dir(LUOGU_DIR, "*.html", "r").items())
+    if not pages:
+        print("No saved pages found, using a synthetic Luogu page.")
+        pages = [("synthetic", make_fake_page())]
+    return pages
+
+
+def make_checkins(users=10000, days=730, rate=0.1, seed=0):
+    """模拟打卡数据 {uid: {date: rp}}：users 个用户、days 天，每人每天以 rate 的概率打卡"""
+    rng = random.Random(seed)
+    end = datetime.date(2026, 1, 1)
+    dates = [(end - datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    checkins = {}
+    for u in range(users):
+        uid = str(100000000000000000 + u)
+        picked = {d: rng.randint(0, 100) for d in dates if rng.random() < rate}
+        if picked:
+            checkins[uid] = picked
+    return checkins, dates
@@ -0,0 +1,79 @@
+"""基准测试的公共部分：计时、延迟分位数、峰值内存、结果保存和对比"""
+
+import gc
+import json
+import time
+import tracemalloc
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, func, repeat=20, warmup=1, items=1):
+    """重复调用 func()，返回吞吐 (items/s)、延迟分位数 (ms) 和峰值内存 (KiB)
+
+    items 是每次调用处理的数量 (例如文章数)，用来算吞吐
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    # tracemalloc 会拖慢计时，峰值内存单独跑一次
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(samples)
+    return {
+        "name": name,
+        "runs": repeat,
+        "throughput": items * repeat / total if total else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def print_results(results, baseline=None):
+    """打印结果表，传入 baseline ({name: result}) 时附上 p50 的变化"""
+    header = (
+        f"{'benchmark':<44}{'ops/s':>12}{'p50 ms':>10}{'p90 ms':>10}"
+        f"{'p99 ms':>10}{'peak KiB':>11}"
+    )
+    if baseline:
+        header += f"{'p50 vs base':>13}"
+    print(header)
+    for r in results:
+        line = (
+            f"{r['name']:<44}{r['throughput']:>12.1f}{r['p50_ms']:>10.3f}"
+            f"{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['peak_kib']:>11.0f}"
+        )
+        base = (baseline or {}).get(r["name"])
+        if base and base["p50_ms"]:
+            change = (r["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100
+            line += f"{change:>+12.1f}%"
+        print(line)
+
+
+def save_results(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_baseline(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {r["name"]: r for r in json.load(f)}
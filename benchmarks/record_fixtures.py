@@ -0,0 +1,44 @@
+"""把真实页面保存到 fixtures/，之后的基准测试就用录制的页面
+
+用法 (在仓库根目录运行，需要联网)：
+  python -m benchmarks.record_fixtures rss <url> <name>
+  python -m benchmarks.record_fixtures luogu <uid> <name>
+"""
+
+import os
+import sys
+
+import cloudscraper
+import requests
+
+from benchmarks.fixtures import LUOGU_DIR, RSS_DIR
+from utils.luogu_client import ARTICLE_LIST_URL
+from utils.scrapers import RSS_HEADERS, RSS_TIMEOUT
+
+
+def save(directory, filename, body):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    with open(path, "wb") as f:
+        f.write(body)
+    print(f"Saved {len(body)} bytes to {path}")
+
+
+def main(argv):
+    if len(argv) != 3 or argv[0] not in ("rss", "luogu"):
+        print(__doc__)
+        return
+    kind, source, name = argv
+    if kind == "rss":
+        r = requests.get(source, headers=RSS_HEADERS, timeout=RSS_TIMEOUT)
+        r.raise_for_status()
+        save(RSS_DIR, f"{name}.xml", r.content)
+    else:
+        scraper = cloudscraper.create_scraper()
+        r = scraper.get(ARTICLE_LIST_URL.format(uid=source, page=1), timeout=30)
+        r.raise_for_status()
+        save(LUOGU_DIR, f"{name}.html", r.content)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -4,27 +4,71 @@ import random
 import datetime
 import asyncio
 import io
-import matplotlib
+import traceback
+from utils.chart_pool import ChartPool, ChartPoolBusy
+from utils.render_cache import RenderCache
+from utils.send_queue import NORMAL
 
-# 强制使用非交互式后端，防止报错
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-# 👇 1. 修改主题为默认 (白底)
-plt.style.use("default")
-# 如果你想让网格线好看点，可以用这个：
-# plt.style.use("seaborn-v0_8-whitegrid")
+# !rank 支持的区间：参数 -> (天数, 名称)
+RANK_PERIODS = {"week": (7, "近 7 天"), "month": (30, "近 30 天")}
+TODAY_RANK_TITLE = "Today's RP Leaderboard (Top 10)"
 
 
 class CheckIn(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.data = bot.data_manager
+        # 相同数据的图直接复用，有人打卡时让相关的图失效
+        self.render_cache = RenderCache()
+        self.data.checkin_listeners.append(self._on_checkin)
+        # 画图放到专用进程池，不和 RSS 爬虫抢线程，也不共享 pyplot 状态
+        self.chart_pool = ChartPool(
+            workers=bot.config.get("chart_workers", 2),
+            max_pending=bot.config.get("chart_queue_size", 8),
+        )
+        bot.metrics.register_gauge(
+            "bot_executor_queue_depth",
+            lambda: self.chart_pool.pending,
+            "Jobs queued or running in an executor",
+            executor="chart-pool",
+        )
         self.daily_summary_task.start()
 
+    async def cog_load(self):
+        asyncio.create_task(self.chart_pool.warm_up())
+
     def cog_unload(self):
         self.daily_summary_task.cancel()
+        self.data.checkin_listeners.remove(self._on_checkin)
+        self.chart_pool.close()
+        self.bot.metrics.unregister_gauge(
+            "bot_executor_queue_depth", executor="chart-pool"
+        )
+
+    async def cog_command_error(self, ctx, error):
+        if isinstance(error, commands.CommandInvokeError) and isinstance(
+            error.original, ChartPoolBusy
+        ):
+            await ctx.reply("⏳ 画图的人太多啦，请稍后再试。")
+        elif isinstance(error, commands.CommandInvokeError):
+            # 有了 cog_command_error，discord.py 不再替这个 cog 打印异常，自己打出来
+            traceback.print_exception(error.original)
+            await ctx.reply(f"❌ 出错了: {error.original}")
+        else:
+            # 找不到用户、参数错误之类的提示由 general 的 on_command_error 回复，这里只记日志
+            print(f"⚠️ {ctx.command} 指令错误: {error}")
+
+    def _on_checkin(self, uid, date_str):
+        self.render_cache.invalidate(date_str, f"user:{uid}", "range")
+
+    async def _render(self, tags, chart_name, *args):
+        """画图并返回 PNG bytes，绘图数据和标题都没变时直接用缓存"""
+        key = self.render_cache.make_key(chart_name, *args)
+        image_bytes = self.render_cache.get(key)
+        if image_bytes is None:
+            image_bytes = await self.chart_pool.render(chart_name, *args)
+            self.render_cache.put(key, image_bytes, tags)
+        return image_bytes
 
     def get_today_str(self):
         tz = datetime.timezone(datetime.timedelta(hours=8))
@@ -35,92 +79,6 @@ class CheckIn(commands.Cog):
         yesterday = datetime.datetime.now(tz) - datetime.timedelta(days=1)
         return yesterday.strftime("%Y-%m-%d")
 
-    # --- 画图辅助函数 ---
-
-    def _plot_history(self, dates, rps, username):
-        """画个人历史趋势图"""
-        fig, ax = plt.subplots(figsize=(10, 5))
-        date_objs = [datetime.datetime.strptime(d, "%Y-%m-%d") for d in dates]
-
-        # 线条颜色保持好看的青色
-        ax.plot(
-            date_objs,
-            rps,
-            marker="o",
-            color="#1ABC9C",
-            linestyle="-",
-            linewidth=2,
-            label="RP Value",
-        )
-        ax.fill_between(date_objs, rps, color="#1ABC9C", alpha=0.3)
-
-        # 👇 2. 文字颜色改为黑色 (black)
-        ax.set_title(
-            f"RP History: {username}", fontsize=16, color="black", fontweight="bold"
-        )
-        ax.set_ylabel("RP Value (0-100)", color="black")
-
-        # 网格线稍微深一点
-        ax.grid(True, linestyle="--", alpha=0.5, color="gray")
-        ax.set_ylim(0, 105)
-
-        # 设置坐标轴刻度颜色
-        ax.tick_params(axis="x", colors="black")
-        ax.tick_params(axis="y", colors="black")
-
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d"))
-        fig.autofmt_xdate()
-
-        buf = io.BytesIO()
-        # 👇 3. 关键：transparent=False, facecolor='white' (强制白底)
-        plt.savefig(
-            buf, format="png", bbox_inches="tight", transparent=False, facecolor="white"
-        )
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-
-    def _plot_rank(self, user_rps, title_text="Today's RP Leaderboard (Top 10)"):
-        """画排行榜柱状图"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        names = [x[0] for x in user_rps][:10]
-        values = [x[1] for x in user_rps][:10]
-
-        colors = [
-            "#FFD700" if v == 100 else "#E74C3C" if v < 60 else "#1ABC9C"
-            for v in values
-        ]
-
-        bars = ax.barh(names, values, color=colors)
-        ax.invert_yaxis()
-
-        # 👇 文字颜色改为黑色
-        ax.bar_label(bars, padding=3, color="black", fontweight="bold")
-
-        ax.set_title(title_text, fontsize=16, color="black", fontweight="bold")
-        ax.set_xlabel("RP Value", color="black")
-
-        ax.tick_params(axis="x", colors="black")
-        ax.tick_params(axis="y", colors="black")
-
-        ax.set_xlim(0, 110)
-        ax.spines["top"].set_visible(False)
-        ax.spines["right"].set_visible(False)
-
-        # 只要左边和下边的边框
-        ax.spines["left"].set_color("black")
-        ax.spines["bottom"].set_color("black")
-
-        buf = io.BytesIO()
-        # 👇 强制白底
-        plt.savefig(
-            buf, format="png", bbox_inches="tight", transparent=False, facecolor="white"
-        )
-        buf.seek(0)
-        plt.close(fig)
-        return buf
-
     # ... (后面的 daily_summary_task 和命令逻辑保持不变) ...
     # 为了完整性，下面是定时任务和命令代码（和之前一样）
 
@@ -128,8 +86,12 @@ class CheckIn(commands.Cog):
     async def daily_summary_task(self):
         await self.bot.wait_until_ready()
         print("⏰ Starting daily RP summary task...")
+        with self.bot.metrics.time_task("daily_summary_task"):
+            await self.send_daily_summary()
+
+    async def send_daily_summary(self):
         yesterday_str = self.get_yesterday_str()
-        rank_data = self.data.get_day_rank(yesterday_str)
+        rank_data = self.data.get_day_rank(yesterday_str, top=10)
         if not rank_data:
             return
         plot_data = []
@@ -137,27 +99,26 @@ class CheckIn(commands.Cog):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else f"User({uid})"
             plot_data.append((name, rp))
-        loop = asyncio.get_running_loop()
-        buf = await loop.run_in_executor(
-            None, self._plot_rank, plot_data, f"Daily RP Summary: {yesterday_str}"
+        image_bytes = await self._render(
+            (yesterday_str,),
+            "plot_rank",
+            plot_data,
+            f"Daily RP Summary: {yesterday_str}",
         )
-        image_bytes = buf.getvalue()
-        buf.close()
-        channels_conf = self.bot.config.get("channels", [])
-        for ch in channels_conf:
-            if ch.get("rp_total_board") is True:
-                channel_id = ch["id"]
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    try:
-                        temp_buf = io.BytesIO(image_bytes)
-                        file = discord.File(temp_buf, filename="daily_summary.png")
-                        await channel.send(
-                            content=f"📅 **昨日人品总结 ({yesterday_str})** 已生成！",
-                            file=file,
-                        )
-                    except Exception as e:
-                        print(f"Failed to send summary to {channel_id}: {e}")
+        for ch in self.bot.channel_registry.with_feature("rp_total_board"):
+            channel = self.bot.get_channel(ch.id)
+            if channel:
+                try:
+                    temp_buf = io.BytesIO(image_bytes)
+                    file = discord.File(temp_buf, filename="daily_summary.png")
+                    await self.bot.send_queue.send(
+                        channel,
+                        NORMAL,
+                        content=f"📅 **昨日人品总结 ({yesterday_str})** 已生成！",
+                        file=file,
+                    )
+                except Exception as e:
+                    print(f"Failed to send summary to {ch.id}: {e}")
 
     @commands.command(name="sign", aliases=["daka", "clockin"])
     async def sign(self, ctx):
@@ -195,19 +156,25 @@ class CheckIn(commands.Cog):
         recent_dates = sorted_dates[-7:]
         recent_rps = [history[d] for d in recent_dates]
         await ctx.typing()
-        loop = asyncio.get_running_loop()
-        buf = await loop.run_in_executor(
-            None, self._plot_history, recent_dates, recent_rps, target_user.name
+        image_bytes = await self._render(
+            (f"user:{target_user.id}",),
+            "plot_history",
+            recent_dates,
+            recent_rps,
+            target_user.name,
         )
-        file = discord.File(buf, filename="history.png")
+        file = discord.File(io.BytesIO(image_bytes), filename="history.png")
         await ctx.reply(
             content=f"📊 **{target_user.display_name}** 的人品趋势：", file=file
         )
 
     @commands.command(name="rank", aliases=["leaderboard"])
-    async def rank(self, ctx):
+    async def rank(self, ctx, period: str = None):
+        if period is not None:
+            await self.range_rank(ctx, period)
+            return
         today = self.get_today_str()
-        rank_data = self.data.get_day_rank(today)
+        rank_data = self.data.get_day_rank(today, top=10)
         if not rank_data:
             await ctx.reply("今天还没有人打卡呢，快来抢沙发！")
             return
@@ -217,11 +184,44 @@ class CheckIn(commands.Cog):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else f"User({uid})"
             plot_data.append((name, rp))
-        loop = asyncio.get_running_loop()
-        buf = await loop.run_in_executor(None, self._plot_rank, plot_data)
-        file = discord.File(buf, filename="rank.png")
+        image_bytes = await self._render(
+            (today,), "plot_rank", plot_data, TODAY_RANK_TITLE
+        )
+        file = discord.File(io.BytesIO(image_bytes), filename="rank.png")
         await ctx.reply(content=f"🏆 **{today}** 人品排行榜：", file=file)
 
+    async def range_rank(self, ctx, period):
+        """!rank week / !rank month：最近 7 / 30 天的平均人品排行"""
+        if period not in RANK_PERIODS:
+            await ctx.reply("❌ 用法：`rank`、`rank week` 或 `rank month`")
+            return
+        days, label = RANK_PERIODS[period]
+        tz = datetime.timezone(datetime.timedelta(hours=8))
+        now = datetime.datetime.now(tz)
+        start = (now - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        end = now.strftime("%Y-%m-%d")
+
+        rank_data = self.data.get_range_rank(start, end, top=10)
+        if not rank_data:
+            await ctx.reply(f"{label}还没有人打卡呢！")
+            return
+        await ctx.typing()
+        plot_data = []
+        for uid, avg_rp, count in rank_data:
+            user = self.bot.get_user(int(uid))
+            name = user.display_name if user else f"User({uid})"
+            plot_data.append((f"{name} ({count}d)", avg_rp))
+        image_bytes = await self._render(
+            ("range",),
+            "plot_rank",
+            plot_data,
+            f"Average RP: last {days} days (Top 10)",
+        )
+        file = discord.File(io.BytesIO(image_bytes), filename="rank.png")
+        await ctx.reply(
+            content=f"🏆 **{label}** ({start} ~ {end}) 平均人品排行榜：", file=file
+        )
+
 
 async def setup(bot):
     await bot.add_cog(CheckIn(bot))
@@ -1,40 +1,62 @@
 import discord
 from discord.ext import commands, tasks
-import aiohttp
+import asyncio
 import datetime
+import time
+from utils.response_cache import ResponseCache
+from utils.send_queue import NORMAL
 
 # API 地址
 BING_API = "https://60s.viki.moe/v2/bing"
 HISTORY_API = "https://60s.viki.moe/v2/today-in-history"
 NEWS_API = "https://60s.viki.moe/v2/60s"
 
+# 这几个接口每天 (北京时间零点) 更新一次，缓存到零点为止，最多缓存 TTL 秒
+BEIJING_TZ = datetime.timezone(datetime.timedelta(hours=8))
+API_TTL = {
+    BING_API: 6 * 3600,
+    HISTORY_API: 6 * 3600,
+    NEWS_API: 3600,
+}
+
 
 class DailyTasks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # 接口响应缓存，重启、重试时不用重新请求
+        self.cache = ResponseCache(
+            self.fetch_api,
+            cache_file=bot.config.get("daily_cache_file", "data/daily_cache.json"),
+        )
         # 启动定时任务
         self.daily_push_task.start()
 
     def cog_unload(self):
         self.daily_push_task.cancel()
+        self.cache.close()
 
-    async def get_json(self, url):
-        """通用异步请求函数"""
+    async def fetch_api(self, url, **kwargs):
+        data = await self.bot.http_client.get_json(url, **kwargs)
+        # 只缓存正常的返回
+        if not data or data.get("code") != 200:
+            raise ValueError(f"Bad response from {url}: {data and data.get('code')}")
+        return data
+
+    async def get_json(self, url, allow_stale=True):
+        """通用异步请求函数，优先走缓存；allow_stale=False 时不返回过期数据"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
+            return await self.cache.get(
+                url, API_TTL.get(url, 3600), tz=BEIJING_TZ, allow_stale=allow_stale
+            )
         except Exception as e:
             print(f"Error fetching {url}: {e}")
         return None
 
     # --- 必应壁纸逻辑 ---
-    async def send_bing_wallpaper(self):
-        data = await self.get_json(BING_API)
+    def build_bing_embed(self, data):
         if not data or data.get("code") != 200:
             print("Failed to get Bing wallpaper")
-            return
+            return None
 
         item = data["data"]
 
@@ -47,23 +69,13 @@ class DailyTasks(commands.Cog):
         )
         embed.set_image(url=item["cover"])  # 使用预览图 (cover)
         embed.set_footer(text=f"{item['copyright']} | {item['update_date']}")
-
-        # 遍历所有频道发送
-        for ch_conf in self.bot.config.get("channels", []):
-            if ch_conf.get("daily_bing", False):
-                channel = self.bot.get_channel(ch_conf["id"])
-                if channel:
-                    try:
-                        await channel.send(embed=embed)
-                    except Exception as e:
-                        print(f"Failed to send Bing to {channel.id}: {e}")
+        return embed
 
     # --- 历史上的今天逻辑 ---
-    async def send_history_today(self):
-        data = await self.get_json(HISTORY_API)
+    def build_history_embed(self, data):
         if not data or data.get("code") != 200:
             print("Failed to get history data")
-            return
+            return None
 
         today_data = data["data"]
         date_str = f"{today_data['month']}月{today_data['day']}日"
@@ -91,22 +103,13 @@ class DailyTasks(commands.Cog):
 
         # if len(items) > 5:
         #     embed.set_footer(text=f"还有 {len(items)-5} 个事件未显示...")
+        return embed
 
-        # 遍历所有频道发送
-        for ch_conf in self.bot.config.get("channels", []):
-            if ch_conf.get("daily_history", False):
-                channel = self.bot.get_channel(ch_conf["id"])
-                if channel:
-                    try:
-                        await channel.send(embed=embed)
-                    except Exception as e:
-                        print(f"Failed to send History to {channel.id}: {e}")
-
-    async def send_daily_60s(self):
-        data = await self.get_json(NEWS_API)
+    # --- 每天 60 秒读懂世界 ---
+    def build_60s_embed(self, data):
         if not data or data.get("code") != 200:
             print("Failed to get 60s news")
-            return
+            return None
 
         item = data["data"]
         news_list = item["news"]
@@ -136,15 +139,58 @@ class DailyTasks(commands.Cog):
         # 4. 设置 Footer (每日一句)
         embed.set_footer(text=f"💡 {item['tip']} | 农历 {item['lunar_date']}")
 
-        # 5. 发送
-        for ch_conf in self.bot.config.get("channels", []):
-            if ch_conf.get("daily_60s", False):  # 👈 检查配置开关
-                channel = self.bot.get_channel(ch_conf["id"])
-                if channel:
-                    try:
-                        await channel.send(embed=embed)
-                    except Exception as e:
-                        print(f"Failed to send 60s News to {channel.id}: {e}")
+        return embed
+
+    async def send_to_channel(self, ch_id, embeds):
+        """按顺序把 embeds 发到一个频道，返回发送成功的条数"""
+        channel = self.bot.get_channel(ch_id)
+        if not channel:
+            return 0
+        sent = 0
+        # 限流交给发送队列，同一频道内按顺序发
+        for name, embed in embeds:
+            try:
+                await self.bot.send_queue.send(channel, NORMAL, embed=embed)
+                sent += 1
+            except Exception as e:
+                print(f"Failed to send {name} to {ch_id}: {e}")
+        return sent
+
+    async def push_daily(self):
+        """并发请求三个接口，每个 embed 只构建一次，再并发发到各个频道"""
+        started = time.perf_counter()
+        pushes = [
+            ("daily_bing", "Bing", BING_API, self.build_bing_embed),
+            ("daily_history", "History", HISTORY_API, self.build_history_embed),
+            ("daily_60s", "60s News", NEWS_API, self.build_60s_embed),
+        ]
+        # 每日推送必须是当天的数据，不用过期缓存
+        results = await asyncio.gather(
+            *(self.get_json(api, allow_stale=False) for _, _, api, _ in pushes)
+        )
+        embeds = {}
+        for (flag, name, _, build), data in zip(pushes, results):
+            embed = build(data)
+            if embed is not None:
+                embeds[flag] = (name, embed)
+        fetched = time.perf_counter()
+
+        # 每个频道按 必应 -> 历史 -> 60s 的顺序发，频道之间并发
+        jobs = {}
+        for flag, item in embeds.items():
+            for ch in self.bot.channel_registry.with_feature(flag):
+                jobs.setdefault(ch.id, []).append(item)
+        sent = await asyncio.gather(
+            *(self.send_to_channel(ch_id, wanted) for ch_id, wanted in jobs.items())
+        )
+        finished = time.perf_counter()
+
+        total = sum(len(wanted) for wanted in jobs.values())
+        print(
+            f"Daily push: fetched {len(embeds)}/{len(pushes)} APIs in "
+            f"{(fetched - started) * 1000:.0f}ms, sent {sum(sent)}/{total} "
+            f"messages to {len(jobs)} channels in {(finished - fetched) * 1000:.0f}ms"
+        )
 
     # --- 定时任务 ---
     # UTC 16:05 = 北京时间 00:05
@@ -153,10 +199,8 @@ class DailyTasks(commands.Cog):
         await self.bot.wait_until_ready()
         print("⏰ Starting Daily Bing & History push...")
 
-        # 执行两个任务
-        await self.send_bing_wallpaper()
-        await self.send_history_today()
-        await self.send_daily_60s()
+        with self.bot.metrics.time_task("daily_push_task"):
+            await self.push_daily()
 
         print("✅ Daily push finished.")
 
@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-import aiohttp
+from utils.http_client import HttpStatusError
 
 FABING_API = "https://60s.viki.moe/v2/fabing"
 
@@ -51,12 +51,10 @@ class Fabing(commands.Cog):
         params = {"name": target_name}
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(FABING_API, params=params) as resp:
-                    if resp.status != 200:
-                        await ctx.reply("发病失败，医生正在赶来的路上...")
-                        return
-                    data = await resp.json()
+            data = await self.bot.http_client.get_json(FABING_API, params=params)
+        except HttpStatusError:
+            await ctx.reply("发病失败，医生正在赶来的路上...")
+            return
         except Exception as e:
             await ctx.reply(f"网络错误: {e}")
             return
@@ -1,5 +1,6 @@
 from discord.ext import commands
 import discord
+from utils.send_queue import INTERACTIVE
 
 
 class General(commands.Cog):
@@ -23,7 +24,9 @@ class General(commands.Cog):
                 # 1. 贴表情
                 await message.add_reaction(reaction)
                 # 2. 回复表情
-                await message.reply(reaction)
+                await self.bot.send_queue.submit(
+                    message.channel.id, lambda: message.reply(reaction), INTERACTIVE
+                )
             except discord.HTTPException:
                 pass
 
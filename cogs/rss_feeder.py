@@ -1,7 +1,17 @@
 from discord.ext import commands, tasks
 import discord
 import asyncio
-from utils.scrapers import parse_rss, parse_luogu
+import functools
+import time
+from utils.scrapers import parse_rss
+from utils.poller import FeedPoller, get_host
+from utils.subscriptions import RSS_TYPES, build_subscription_index
+from utils.luogu_client import LuoguClient, LUOGU_HOST
+from utils.poll_schedule import PollScheduler
+from utils.send_queue import BULK
+
+# 列表形式的摘要里，每个 embed 的描述最多这么长 (Discord 上限 4096)
+DIGEST_DESCRIPTION_LIMIT = 4000
 
 
 class RSSFeeder(commands.Cog):
@@ -10,89 +20,255 @@ class RSSFeeder(commands.Cog):
         self.data = bot.data_manager  # 引用 bot 实例中的 data_manager
         self.config = bot.config
 
+        # 并发抓取：全局上限、单站点上限、单源超时 (秒)
+        self.poller = FeedPoller(
+            concurrency=self.config.get("rss_concurrency", 8),
+            per_host=self.config.get("rss_per_host_concurrency", 2),
+            timeout=self.config.get("rss_feed_timeout", 120),
+        )
+        self.cycle_lock = asyncio.Lock()
+        bot.metrics.register_gauge(
+            "bot_executor_queue_depth",
+            self.poller.queue_depth,
+            "Jobs queued or running in an executor",
+            executor="feed-poller",
+        )
+        # 所有洛谷 uid 共用 bot 的连接池
+        self.luogu = LuoguClient(
+            bot.http_client,
+            concurrency=self.config.get("luogu_concurrency", 4),
+        )
+        # 同一个源不管被多少频道订阅，每轮只抓一次
+        self.subscriptions = build_subscription_index(bot.channel_registry)
+        # 频道 -> 它订阅的源，brute 用
+        self.channel_subscriptions = {}
+        for sub in self.subscriptions.values():
+            for ch_id in sub.channel_ids:
+                self.channel_subscriptions.setdefault(ch_id, []).append(sub)
+
+        # 每个源按自己的发文频率安排抓取，间隔单位是分钟
+        self.scheduler = PollScheduler(
+            self.data.storage,
+            default_interval=self.config.get("rss_interval", 30) * 60,
+            min_interval=self.config.get("rss_min_interval", 10) * 60,
+            max_interval=self.config.get("rss_max_interval", 360) * 60,
+            jitter=self.config.get("rss_jitter", 0.1),
+        )
+        # 重启后不要所有源一起抓，先均匀错开
+        self.scheduler.spread(
+            [sub.namespace for sub in self.subscriptions.values()], time.time()
+        )
+
         # 启动定时任务
         self.rss_loop.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.rss_loop.cancel()
+        self.poller.close()
+        self.bot.metrics.unregister_gauge(
+            "bot_executor_queue_depth", executor="feed-poller"
+        )
+        await self.luogu.close()
 
-    async def process_feed(self, channel_id, follow_info):
-        """处理单个订阅源"""
-        feed_type = follow_info["type"]
-        results = []  # [(author, articles), ...]
+    async def fetch_source(self, sub):
+        """抓取单个 url / uid，返回 (author, articles, commit)，失败或超时返回 None
 
-        # 将阻塞的爬虫放入线程池运行
-        loop = asyncio.get_running_loop()
-
-        if feed_type in ["cnblogs", "cyx_blogs"]:
-            for url in follow_info["url"]:
-                # run_in_executor 的第一个参数 None 代表使用默认线程池
-                author, articles = await loop.run_in_executor(
-                    None,
+        commit() 保存这次抓取的进度 (条件请求的验证信息、洛谷翻到的位置)，
+        要等所有订阅频道都收到文章之后再调用，否则发送失败的文章下一轮就抓不到了
+        """
+        # 已读记录超过保留期会被淘汰，更早的文章直接跳过，避免重复推送
+        skip_time = max(int(self.config["skip_time"]), self.data.seen_horizon())
+        # 只有所有订阅频道都收到过的文章才算已读
+        seen_checker = functools.partial(
+            self.data.is_seen_by_all, sub.channel_ids, feed=sub.namespace
+        )
+        try:
+            if sub.feed_type in RSS_TYPES:
+                cache = self.data.get_feed_cache(sub.source)
+                author, articles = await self.poller.run(
+                    get_host(sub.source),
                     parse_rss,
-                    url,
-                    self.data.is_url_seen,
-                    int(self.config["skip_time"]),
+                    sub.source,
+                    seen_checker,
+                    skip_time,
+                    cache,
+                    self.config.get("rss_streaming", True),
                 )
-                if articles:
-                    results.append((author, articles))
-                    # 更新 seen_url
-                    for a in articles:
-                        self.data.add_url(a["link"])
-
-        elif feed_type == "luogu":
-            for uid in follow_info["uid"]:
+                commit = functools.partial(self.data.set_feed_cache, sub.source, cache)
+            elif sub.feed_type == "luogu":
                 # 传入 data_manager 因为 luogu 逻辑稍微复杂需要状态
-                author, articles = await loop.run_in_executor(
-                    None, parse_luogu, uid, self.data, int(self.config["skip_time"])
+                author, articles, state = await self.poller.run_async(
+                    LUOGU_HOST,
+                    self.luogu.fetch_articles,
+                    sub.source,
+                    self.data,
+                    skip_time,
+                    seen_checker,
                 )
-                if articles:
-                    results.append((author, articles))
-
-        # 发送消息
-        if results:
-            self.data.save()  # 保存一次状态
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                return
-
-            for author, articles in results:
-                for a in articles:
-                    embed = discord.Embed(
-                        title=a["title"],
-                        url=a["link"],
-                        description=a["summary"],
-                        color=0x1ABC9C,
+                if state is None:
+                    return None
+                commit = functools.partial(self.data.set_luogu_state, sub.source, state)
+            else:
+                return None
+        except asyncio.TimeoutError:
+            print(f"Timeout fetching {sub.feed_type} source {sub.source}")
+            return None
+        except Exception as e:
+            print(f"Error fetching {sub.feed_type} source {sub.source}: {e}")
+            return None
+        return author, articles, commit
+
+    async def deliver(self, channel_id, author, articles, sub, follow):
+        """把文章发到一个订阅频道，发送成功才记为已投递
+
+        follow 里 digest 为 true 时多篇文章合并成一条多 embed 消息，
+        新文章超过 digest_list_threshold 篇时改发紧凑的列表；digest 为 false (默认) 时一篇一条
+        """
+        channel = self.bot.get_channel(channel_id)
+        pending = [
+            a
+            for a in articles
+            if not self.data.is_delivered(channel_id, a["link"], feed=sub.namespace)
+        ]
+        digest = follow.get("digest", False)
+        threshold = follow.get("digest_list_threshold", 10)
+        if digest and threshold and len(pending) > threshold:
+            groups = self.digest_embeds(pending, author)
+        else:
+            groups = [(self.article_embed(a, author), [a]) for a in pending]
+
+        # 找不到频道时直接记为已投递，避免每轮重试
+        results = [None] * len(groups)
+        if channel:
+            # 一次性排队，digest 模式下发送队列会把同一频道的 embed 合并成一条消息
+            results = await asyncio.gather(
+                *(
+                    self.bot.send_queue.send(
+                        channel, BULK, coalesce=digest, embed=embed
                     )
-                    embed.set_author(name=author)
-                    embed.set_footer(text=a["time"])
-                    await channel.send(embed=embed)
+                    for embed, _ in groups
+                ),
+                return_exceptions=True,
+            )
+        for (_, group), result in zip(groups, results):
+            if isinstance(result, BaseException):
+                # 下一轮再试
+                print(f"Failed to send articles to {channel_id}: {result}")
+                continue
+            for a in group:
+                self.data.mark_delivered(
+                    channel_id, a["link"], sub.channel_ids, feed=sub.namespace
+                )
 
-    @tasks.loop(minutes=30)
+    def digest_embeds(self, articles, author):
+        """把文章列成 [(embed, 这个 embed 里的文章), ...]，每篇一行"""
+        chunks = [[]]
+        length = 0
+        for a in articles:
+            line = f"• [{a['title']}]({a['link']}) {a['time']}"
+            if chunks[-1] and length + len(line) + 1 > DIGEST_DESCRIPTION_LIMIT:
+                chunks.append([])
+                length = 0
+            chunks[-1].append((a, line))
+            length += len(line) + 1
+
+        groups = []
+        for i, chunk in enumerate(chunks, 1):
+            title = f"{len(articles)} 篇新文章"
+            if len(chunks) > 1:
+                title += f" ({i}/{len(chunks)})"
+            embed = discord.Embed(
+                title=title,
+                # 单行就超长的极端情况直接截断
+                description="\n".join(line for _, line in chunk)[:4096],
+                color=0x1ABC9C,
+            )
+            embed.set_author(name=author)
+            groups.append((embed, [a for a, _ in chunk]))
+        return groups
+
+    def article_embed(self, a, author):
+        embed = discord.Embed(
+            title=a["title"],
+            url=a["link"],
+            description=a["summary"],
+            color=0x1ABC9C,
+        )
+        embed.set_author(name=author)
+        embed.set_footer(text=a["time"])
+        return embed
+
+    async def process_subscription(self, sub):
+        """抓取一次，分发给所有订阅频道，再安排下一次抓取"""
+        item = await self.fetch_source(sub)
+        if item:
+            self.scheduler.record(sub.namespace, [a.get("timestamp") for a in item[1]])
+        self.scheduler.schedule(sub.namespace, time.time())
+        if not item:
+            return
+        author, articles, commit = item
+        if articles:
+            await asyncio.gather(
+                *(
+                    self.deliver(ch_id, author, articles, sub, follow)
+                    for ch_id, follow in sub.subscribers
+                )
+            )
+        # 有频道没收到就不保存进度，下一轮重新抓取，只补发给缺的频道
+        if all(
+            self.data.is_seen_by_all(sub.channel_ids, a["link"], feed=sub.namespace)
+            for a in articles
+        ):
+            commit()
+
+    async def run_subscriptions(self, subs):
+        """并发处理一批订阅源，结束后统一保存一次状态"""
+
+        async def run_one(sub):
+            try:
+                await self.process_subscription(sub)
+            except Exception as e:
+                print(f"Error processing feed {sub.source}: {e}")
+
+        # 同一时间只跑一轮，避免 brute 和定时任务重复抓取
+        async with self.cycle_lock:
+            try:
+                await asyncio.gather(*(run_one(sub) for sub in subs))
+            finally:
+                self.data.evict_seen()
+                self.data.save()
+
+    # 每分钟看一下哪些源到了抓取时间
+    @tasks.loop(minutes=1)
     async def rss_loop(self):
         await self.bot.wait_until_ready()
-        print("Starting RSS check...")
+        due_keys = set(
+            self.scheduler.due(
+                [sub.namespace for sub in self.subscriptions.values()], time.time()
+            )
+        )
+        due = [sub for sub in self.subscriptions.values() if sub.namespace in due_keys]
+        if not due:
+            return
+        print(
+            f"Starting RSS check: {len(due)}/{len(self.subscriptions)} sources due..."
+        )
+        start = time.perf_counter()
 
-        for ch_config in self.config["channels"]:
-            ch_id = ch_config["id"]
-            for follow in ch_config.get("follow_articles", []):
-                try:
-                    await self.process_feed(ch_id, follow)
-                except Exception as e:
-                    print(f"Error processing feed in channel {ch_id}: {e}")
+        with self.bot.metrics.time_task("rss_loop"):
+            await self.run_subscriptions(due)
 
-        print("RSS check finished.")
+        print(
+            f"RSS check finished: {len(due)} sources "
+            f"in {time.perf_counter() - start:.1f}s."
+        )
 
     @commands.command(name="brute")
     async def force_check(self, ctx):
         """手动触发更新 (仅限配置的管理员)"""
 
         # 1. 寻找当前频道的配置
-        current_ch_conf = None
-        for ch in self.config.get("channels", []):
-            if ch["id"] == ctx.channel.id:
-                current_ch_conf = ch
-                break
+        current_ch_conf = self.bot.channel_registry.get(ctx.channel.id)
 
         # 如果当前频道不在配置文件里，直接忽略
         if not current_ch_conf:
@@ -100,8 +276,8 @@ class RSSFeeder(commands.Cog):
             return
 
         # 2. 权限检查
-        # 获取允许的用户列表，默认为空列表 []
-        allowed_users = current_ch_conf.get("brute_admin", [])
+        # 获取允许的用户列表，默认为空
+        allowed_users = current_ch_conf.brute_admin
 
         # 如果列表为空，或者当前用户不在列表里
         if ctx.author.id not in allowed_users:
@@ -115,10 +291,10 @@ class RSSFeeder(commands.Cog):
 
         try:
             # 3. 处理 RSS 文章订阅
-            article_feeds = current_ch_conf.get("follow_articles", [])
-            if article_feeds:
-                for follow in article_feeds:
-                    await self.process_feed(ctx.channel.id, follow)
+            # 本频道订阅的源抓一次，新文章同时发给所有订阅了它的频道
+            subs = self.channel_subscriptions.get(ctx.channel.id, [])
+            if subs:
+                await self.run_subscriptions(subs)
 
             await status_msg.edit(content="✅ 刷新完成。")
 
@@ -1,63 +1,59 @@
 import discord
 from discord.ext import commands
-import aiohttp
+from io import BytesIO
+from utils.setu_buffer import SetuBuffer, SetuError
 
 
 class Setu(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # 每种 r18 模式预先准备几张图，命令直接回复
+        self.buffer = SetuBuffer(
+            bot.http_client,
+            size=bot.config.get("setu_prefetch", 3),
+            max_bytes=bot.config.get("setu_buffer_mb", 32) * 1024 * 1024,
+            upload_bytes=bot.config.get("setu_upload_mb", 8) * 1024 * 1024,
+            download_bytes=bot.config.get("setu_download_mb", 20) * 1024 * 1024,
+        )
+
+    async def cog_load(self):
+        # 按配置里开启了涩图的频道的 r18 设置预热
+        modes = {ch.r18 for ch in self.bot.channel_registry.with_feature("setu")}
+        for r18_mode in modes:
+            self.buffer.refill(r18_mode)
 
-    def get_channel_config(self, channel_id):
-        for ch in self.bot.config.get("channels", []):
-            if ch["id"] == channel_id:
-                return ch
-        return None
+    def cog_unload(self):
+        self.buffer.close()
 
     @commands.command(name="setu")
     async def setu(self, ctx):
         # 1. 检查配置
-        ch_conf = self.get_channel_config(ctx.channel.id)
-        if not ch_conf or not ch_conf.get("setu", False):
+        ch_conf = self.bot.channel_registry.get(ctx.channel.id)
+        if not ch_conf or not ch_conf.setu:
             await ctx.reply("❌ 本频道未开启涩图功能。")
             return
 
-        # 2. 准备参数
-        r18_mode = ch_conf.get("r18", 0)  # 0:非R18, 1:R18, 2:混合
-        params = {"r18": r18_mode, "aiType": 1}  # aiType = 1 无 AI
-        url = "https://api.lolicon.app/setu/v2"
-
-        # 3. 请求 API
-        await ctx.typing()
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        await ctx.reply(f"API 请求失败: {resp.status}")
-                        return
-                    data = await resp.json()
-        except Exception as e:
-            await ctx.reply(f"网络错误: {e}")
-            return
+        r18_mode = ch_conf.r18  # 0:非R18, 1:R18, 2:混合
 
-        # 4. 检查数据
-        if data.get("error"):
-            await ctx.reply(f"API 返回错误: {data['error']}")
-            return
-        if not data.get("data"):
-            await ctx.reply("没找到图，换个姿势试试？")
-            return
+        # 2. 优先从缓冲区取，没有再现场请求
+        item = self.buffer.pop(r18_mode)
+        if item is None:
+            await ctx.typing()
+            try:
+                item = await self.buffer.fetch(r18_mode)
+            except SetuError as e:
+                await ctx.reply(str(e))
+                return
+        img_data, image_bytes = item
 
-        # 5. 解析第一张图
-        img_data = data["data"][0]
+        # 3. 解析图片信息
         pid = img_data["pid"]
         title = img_data["title"]
         author = img_data["author"]
         tags = img_data["tags"]
-        # API 默认返回的是 i.pixiv.re 的代理链接，Discord 可以直接显示
-        img_url = img_data["urls"]["original"]
         is_r18 = img_data.get("r18", False)
 
-        # 6. 构建 Embed
+        # 4. 构建 Embed
         color = 0xFF69B4 if is_r18 else 0x3498DB
         embed = discord.Embed(
             title=title, url=f"https://www.pixiv.net/artworks/{pid}", color=color
@@ -69,45 +65,11 @@ class Setu(commands.Cog):
         tag_str = ", ".join(tags)[:100]
         embed.add_field(name="Tags", value=tag_str, inline=False)
 
-        # 🟢 最终逻辑判断
-        # 只有 R18 才下载并遮罩，普通图依然秒发 URL
-        need_spoiler = is_r18 or ("R-18" in tags)
-
-        if need_spoiler:
-            # R18：下载 -> 遮罩上传
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(img_url) as resp:
-                        if resp.status == 200:
-                            data = await resp.read()
-                            from io import BytesIO
-
-                            # 只要文件名带 SPOILER_，Discord 就会加遮罩
-                            f = discord.File(BytesIO(data), filename="SPOILER_setu.png")
-                            # 图片不放 Embed 里，而是作为附件
-                            await ctx.reply(embed=embed, file=f)
-                        else:
-                            await ctx.reply("图片加载失败")
-            except:
-                await ctx.reply("下载出错，请重试")
-        else:
-            # 非R18：秒发 URL
-            # embed.set_image(url=img_url)
-            # await ctx.reply(embed=embed)
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(img_url) as resp:
-                        if resp.status == 200:
-                            data = await resp.read()
-                            from io import BytesIO
-
-                            f = discord.File(BytesIO(data), filename="SPOILER_setu.png")
-                            # 图片不放 Embed 里，而是作为附件
-                            await ctx.reply(embed=embed, file=f)
-                        else:
-                            await ctx.reply("图片加载失败")
-            except:
-                await ctx.reply("下载出错，请重试")
+        # 不管是不是 R18，都遮罩上传
+        # 只要文件名带 SPOILER_，Discord 就会加遮罩
+        f = discord.File(BytesIO(image_bytes), filename="SPOILER_setu.png")
+        # 图片不放 Embed 里，而是作为附件
+        await ctx.reply(embed=embed, file=f)
 
 
 async def setup(bot):
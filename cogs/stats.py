@@ -0,0 +1,34 @@
+import traceback
+from discord.ext import commands
+
+
+class Stats(commands.Cog):
+    """管理员可以用 !stats 查看运行指标 (指令耗时在 MyBot.invoke 里记录)"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = bot.metrics
+
+    async def cog_check(self, ctx):
+        if ctx.author.id in self.bot.config.get("admins", []):
+            return True
+        return await self.bot.is_owner(ctx.author)
+
+    async def cog_command_error(self, ctx, error):
+        if isinstance(error, commands.CheckFailure):
+            await ctx.reply("🚫 **权限不足**：只有管理员可以查看运行指标。")
+        else:
+            traceback.print_exception(error)
+            await ctx.reply(f"❌ 获取运行指标失败: {error}")
+
+    @commands.command(name="stats")
+    async def stats(self, ctx):
+        """查看事件循环延迟、指令和定时任务耗时、队列长度 (仅限管理员)"""
+        text = self.metrics.summary()
+        text += f"\n网关延迟: {round(self.bot.latency * 1000)}ms"
+        # 代码块里对齐好看，超长时截断到 Discord 的 2000 字符以内
+        await ctx.reply(f"```\n{text[:1900]}\n```")
+
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
@@ -2,9 +2,14 @@
 import discord
 import asyncio
 import datetime  # 引入时间库
+import time
 from discord.ext import commands
 from utils.config_loader import load_config
 from utils.data_manager import DataManager
+from utils.channels import ChannelRegistry
+from utils.http_client import HttpClient
+from utils.metrics import Metrics
+from utils.send_queue import NORMAL, QueuedContext, SendQueue
 
 cfg = load_config()
 
@@ -12,6 +17,16 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
+EXTENSIONS = [
+    "cogs.general",
+    "cogs.rss_feeder",
+    "cogs.checkin",
+    "cogs.setu",
+    "cogs.daily_tasks",
+    "cogs.fabing",
+    "cogs.stats",
+]
+
 
 class MyBot(commands.Bot):
     def __init__(self):
@@ -29,16 +44,93 @@ class MyBot(commands.Bot):
         super().__init__(**kwargs)
 
         self.config = cfg
-        self.data_manager = DataManager()
+        # 频道配置索引，按 id 或功能开关查找频道不用再遍历配置
+        self.channel_registry = ChannelRegistry(cfg.get("channels", []))
+        # storage: json (默认) 或 sqlite
+        self.data_manager = DataManager(
+            storage=cfg.get("storage", "json"),
+            db_file=cfg.get("db_file", "data/bot.db"),
+            flush_interval=cfg.get("flush_interval", 10),
+            seen_ttl_days=cfg.get("seen_ttl_days", 180),
+            seen_max_per_feed=cfg.get("seen_max_per_feed", 1000),
+            seen_hash=cfg.get("seen_hash", False),
+        )
+        # 所有 cog 共用的 HTTP 连接池 (bot.http 已经被 discord.py 占用)
+        self.http_client = HttpClient(
+            limit_per_host=cfg.get("http_limit_per_host", 10),
+            timeout=cfg.get("http_timeout", 30),
+            retries=cfg.get("http_retries", 2),
+        )
+        # 所有消息统一排队发送，避免触发 Discord 限流
+        self.send_queue = SendQueue(
+            global_rate=cfg.get("send_global_rate", 40),
+            channel_rate=cfg.get("send_channel_rate", 1),
+            channel_burst=cfg.get("send_channel_burst", 5),
+        )
+        # 运行指标，metrics_port 不为空时开一个 Prometheus 文本接口
+        self.metrics = Metrics(
+            port=cfg.get("metrics_port"),
+            host=cfg.get("metrics_host", "127.0.0.1"),
+        )
+        self.metrics.register_gauge(
+            "bot_send_queue_depth",
+            self.send_queue.depth,
+            "Messages waiting in the send queue",
+        )
         self.has_sent_startup_report = False
+        self.extension_load_times = {}  # {扩展名: 加载耗时 (秒)}
 
     async def setup_hook(self):
-        await self.load_extension("cogs.general")
-        await self.load_extension("cogs.rss_feeder")
-        await self.load_extension("cogs.checkin")
-        await self.load_extension("cogs.setu")
-        await self.load_extension("cogs.daily_tasks")
-        await self.load_extension("cogs.fabing")
+        self.data_manager.start()
+        await self.http_client.start()
+        self.send_queue.start()
+        await self.metrics.start()
+        # to_thread 用的默认线程池 (写盘、压缩图片)
+        loop = asyncio.get_running_loop()
+        self.metrics.register_gauge(
+            "bot_executor_queue_depth",
+            lambda: (
+                loop._default_executor._work_queue.qsize()
+                if loop._default_executor
+                else 0
+            ),
+            executor="default",
+        )
+        # 记录每个扩展的加载耗时，方便发现启动变慢
+        for ext in EXTENSIONS:
+            start = time.perf_counter()
+            await self.load_extension(ext)
+            self.extension_load_times[ext] = time.perf_counter() - start
+            print(f"Loaded {ext} in {self.extension_load_times[ext] * 1000:.0f}ms")
+
+    async def close(self):
+        if self.is_closed():
+            return
+        await super().close()
+        # cog 都卸载之后再把剩余数据写盘、关闭连接池
+        await self.data_manager.close()
+        await self.http_client.close()
+        await self.send_queue.close()
+        await self.metrics.close()
+
+    async def get_context(self, origin, /, *, cls=QueuedContext):
+        # 指令回复也走发送队列
+        return await super().get_context(origin, cls=cls)
+
+    async def invoke(self, ctx):
+        # 指令耗时在这里统计：on_command 监听器是单独的任务，
+        # 等它运行时指令里同步执行的部分 (例如写打卡数据) 已经跑完了
+        started = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            if ctx.command is not None:
+                name = ctx.command.qualified_name
+                self.metrics.observe(
+                    "bot_command_seconds", time.perf_counter() - started, command=name
+                )
+                if ctx.command_failed:
+                    self.metrics.command_error(name)
 
     async def on_ready(self):
         print(f"✅ Logged in as {self.user} (ID: {self.user.id})")
@@ -53,10 +145,8 @@ class MyBot(commands.Bot):
     async def send_startup_report(self):
         """发送上线报告的具体逻辑"""
         # 1. 统计一下监控了多少个源 (可选，为了报告看起来更高级)
-        total_channels = len(self.config["channels"])
-        # total_feeds = sum(
-        #     len(ch.get("follow_articles", "")) for ch in self.config["channels"]
-        # )
+        total_channels = len(self.channel_registry)
+        # total_feeds = sum(len(ch.follow_articles) for ch in self.channel_registry)
 
         total_commands = len(self.commands)
 
@@ -73,16 +163,27 @@ class MyBot(commands.Bot):
         embed.add_field(
             name="当前延迟", value=f"{round(self.latency * 1000)}ms", inline=True
         )
+        load_times = "\n".join(
+            f"`{ext.split('.')[-1]}` {seconds * 1000:.0f}ms"
+            for ext, seconds in self.extension_load_times.items()
+        )
+        total_load = sum(self.extension_load_times.values())
+        embed.add_field(
+            name=f"扩展加载耗时 (共 {total_load * 1000:.0f}ms)",
+            value=load_times or "无",
+            inline=False,
+        )
         embed.set_footer(text="https://github.com/Caylex09/discord-bot")
 
         # 3. 遍历配置文件里的频道并发送
-        for ch_conf in self.config["channels"]:
-            channel_id = ch_conf["id"]
+        # 所有频道都检查一遍，顺便提示找不到的频道
+        for ch_conf in self.channel_registry:
+            channel_id = ch_conf.id
             channel = self.get_channel(channel_id)
             if channel:
-                if ch_conf.get("send_message", False) == True:
+                if ch_conf.send_message:
                     try:
-                        await channel.send(embed=embed)
+                        await self.send_queue.send(channel, NORMAL, embed=embed)
                         print(f"Sent startup report to channel {channel_id}")
                     except discord.Forbidden:
                         print(f"Error: No permission to send in channel {channel_id}")
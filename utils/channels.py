@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+
+# 按开关建索引的功能，对应配置文件里频道的同名布尔项
+FEATURES = (
+    "send_message",
+    "setu",
+    "rp_total_board",
+    "daily_bing",
+    "daily_history",
+    "daily_60s",
+)
+
+
+@dataclass(frozen=True)
+class ChannelConfig:
+    """配置文件里的一个频道"""
+
+    id: int
+    send_message: bool = False
+    brute_admin: tuple = ()
+    follow_articles: tuple = ()
+    setu: bool = False
+    r18: int = 0  # 0 不允许，1 只发 r18，2 混合
+    rp_total_board: bool = False
+    daily_bing: bool = False
+    daily_history: bool = False
+    daily_60s: bool = False
+    raw: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, conf):
+        return cls(
+            id=conf["id"],
+            send_message=conf.get("send_message", False) is True,
+            brute_admin=tuple(conf.get("brute_admin") or ()),
+            follow_articles=tuple(conf.get("follow_articles") or ()),
+            setu=bool(conf.get("setu", False)),
+            r18=conf.get("r18", 0),
+            # 每日总表只认 true，和之前的判断一致
+            rp_total_board=conf.get("rp_total_board") is True,
+            daily_bing=bool(conf.get("daily_bing", False)),
+            daily_history=bool(conf.get("daily_history", False)),
+            daily_60s=bool(conf.get("daily_60s", False)),
+            raw=conf,
+        )
+
+    def has(self, feature):
+        return getattr(self, feature)
+
+
+class ChannelRegistry:
+    """启动时根据配置建好的频道索引：id -> ChannelConfig，功能 -> 开启它的频道
+
+    查找都是 O(1)，遍历时保持配置文件里的顺序
+    """
+
+    def __init__(self, channels):
+        self.by_id = {}
+        for conf in channels:
+            ch = ChannelConfig.from_dict(conf)
+            self.by_id[ch.id] = ch
+        self.features = {
+            name: tuple(ch for ch in self.by_id.values() if ch.has(name))
+            for name in FEATURES
+        }
+        self.feature_ids = {
+            name: frozenset(ch.id for ch in chs) for name, chs in self.features.items()
+        }
+
+    def get(self, channel_id):
+        return self.by_id.get(channel_id)
+
+    def with_feature(self, feature):
+        """开启了 feature 的频道，按配置顺序"""
+        return self.features[feature]
+
+    def enabled(self, channel_id, feature):
+        return channel_id in self.feature_ids[feature]
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
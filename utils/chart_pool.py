@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+# 下面两个函数在子进程里执行，matplotlib 只在子进程里导入，主进程不用付出导入开销
+def _init_worker():
+    from utils import charts
+
+    charts.init_worker()
+
+
+def _render_chart(name, *args):
+    from utils import charts
+
+    return getattr(charts, name)(*args)
+
+
+class ChartPoolBusy(Exception):
+    """排队的画图任务太多"""
+
+
+class ChartPool:
+    """画图专用进程池：每个进程只初始化一次 matplotlib，不占用默认线程池
+
+    同时排队的任务数有上限，排不上队时抛出 ChartPoolBusy
+    """
+
+    def __init__(self, workers=2, max_pending=8, queue_timeout=10):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        # spawn 启动的子进程不会继承事件循环和线程状态
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self.slots = asyncio.Semaphore(max_pending)
+        self.pending = 0  # 排队中和正在画的任务数
+
+    async def warm_up(self):
+        """提前启动所有进程，第一条画图命令不用等进程启动"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _init_worker)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def render(self, name, *args):
+        """在子进程里调用 utils.charts 中名为 name 的画图函数，返回 PNG bytes"""
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ChartPoolBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _render_chart, name, *args)
+        finally:
+            self.pending -= 1
+            self.slots.release()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
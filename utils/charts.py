@@ -0,0 +1,105 @@
+import datetime
+import io
+import matplotlib
+
+# 强制使用非交互式后端，防止报错
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+
+# 👇 1. 修改主题为默认 (白底)
+plt.style.use("default")
+# 如果你想让网格线好看点，可以用这个：
+# plt.style.use("seaborn-v0_8-whitegrid")
+
+
+def init_worker():
+    """画图进程的初始化函数：导入本模块时已经设置好后端和主题，这里顺便预热字体缓存"""
+    fig, ax = plt.subplots()
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def plot_history(dates, rps, username):
+    """画个人历史趋势图"""
+    fig, ax = plt.subplots(figsize=(10, 5))
+    date_objs = [datetime.datetime.strptime(d, "%Y-%m-%d") for d in dates]
+
+    # 线条颜色保持好看的青色
+    ax.plot(
+        date_objs,
+        rps,
+        marker="o",
+        color="#1ABC9C",
+        linestyle="-",
+        linewidth=2,
+        label="RP Value",
+    )
+    ax.fill_between(date_objs, rps, color="#1ABC9C", alpha=0.3)
+
+    # 👇 2. 文字颜色改为黑色 (black)
+    ax.set_title(
+        f"RP History: {username}", fontsize=16, color="black", fontweight="bold"
+    )
+    ax.set_ylabel("RP Value (0-100)", color="black")
+
+    # 网格线稍微深一点
+    ax.grid(True, linestyle="--", alpha=0.5, color="gray")
+    ax.set_ylim(0, 105)
+
+    # 设置坐标轴刻度颜色
+    ax.tick_params(axis="x", colors="black")
+    ax.tick_params(axis="y", colors="black")
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d"))
+    fig.autofmt_xdate()
+
+    buf = io.BytesIO()
+    # 👇 3. 关键：transparent=False, facecolor='white' (强制白底)
+    plt.savefig(
+        buf, format="png", bbox_inches="tight", transparent=False, facecolor="white"
+    )
+    plt.close(fig)
+    # 返回 bytes，方便从子进程传回主进程
+    return buf.getvalue()
+
+
+def plot_rank(user_rps, title_text="Today's RP Leaderboard (Top 10)"):
+    """画排行榜柱状图"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    names = [x[0] for x in user_rps][:10]
+    values = [x[1] for x in user_rps][:10]
+
+    colors = [
+        "#FFD700" if v == 100 else "#E74C3C" if v < 60 else "#1ABC9C" for v in values
+    ]
+
+    bars = ax.barh(names, values, color=colors)
+    ax.invert_yaxis()
+
+    # 👇 文字颜色改为黑色
+    ax.bar_label(bars, padding=3, color="black", fontweight="bold")
+
+    ax.set_title(title_text, fontsize=16, color="black", fontweight="bold")
+    ax.set_xlabel("RP Value", color="black")
+
+    ax.tick_params(axis="x", colors="black")
+    ax.tick_params(axis="y", colors="black")
+
+    ax.set_xlim(0, 110)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+
+    # 只要左边和下边的边框
+    ax.spines["left"].set_color("black")
+    ax.spines["bottom"].set_color("black")
+
+    buf = io.BytesIO()
+    # 👇 强制白底
+    plt.savefig(
+        buf, format="png", bbox_inches="tight", transparent=False, facecolor="white"
+    )
+    plt.close(fig)
+    # 返回 bytes，方便从子进程传回主进程
+    return buf.getvalue()
@@ -1,65 +1,260 @@
-import json
+import asyncio
+import bisect
 import os
 from datetime import datetime
+from utils.storage import JsonStorage, SqliteStorage, migrate_json_to_sqlite
+from utils.seen_store import SeenStore, LEGACY_NAMESPACE
 
 
 class DataManager:
+    # 旧版本在 JSON 文件里存成列表的存储
+    LIST_STORES = ("seen_url",)
+
     def __init__(
         self,
         url_file="data/seen_url.json",
         luogu_file="data/seen_luogu.json",
         checkin_file="data/checkins.json",
+        delivery_file="data/deliveries.json",
+        feed_cache_file="data/feed_cache.json",
+        poll_schedule_file="data/poll_schedule.json",
+        storage="json",
+        db_file="data/bot.db",
+        flush_interval=10,
+        seen_ttl_days=180,
+        seen_max_per_feed=1000,
+        seen_hash=False,
     ):
         self.url_file = url_file
         self.luogu_file = luogu_file
         self.checkin_file = checkin_file  # 新增：打卡数据文件
+        self.delivery_file = delivery_file
+        self.feed_cache_file = feed_cache_file
+        self.poll_schedule_file = poll_schedule_file
+        self.files = {
+            "seen_url": url_file,
+            "seen_luogu": luogu_file,
+            "checkins": checkin_file,
+            "deliveries": delivery_file,
+            "feed_cache": feed_cache_file,
+            "poll_schedule": poll_schedule_file,
+        }
+
+        self.storage = self._open_storage(storage, db_file)
+
+        # 后台写盘：save() 只是标记，最多每 flush_interval 秒在线程里写一次
+        self.flush_interval = flush_interval
+        self._flush_task = None
+        self._flush_event = None
+        self._flush_lock = None
+        # 正在线程里进行的写盘，任务被取消时线程不会停，下一次写盘前要先等它结束
+        self._write_task = None
+        self._write_pending = None
+
+        # 都是存储后端里的实时数据，修改必须通过 self.storage
+        # 已读文章，按订阅源分开记录，过期自动淘汰
+        self.seen = SeenStore(
+            self.storage,
+            ttl_days=seen_ttl_days,
+            max_per_feed=seen_max_per_feed,
+            hashed=seen_hash,
+        )
+        # 洛谷增量抓取的状态 {uid: {"count", "last_lid", "last_time"}}
+        self.seen_luogu = self.storage.load("seen_luogu")
+        self._upgrade_luogu_state()
+        self.checkins = self.storage.load("checkins")  # 新增：加载打卡数据
+        # 还没发送给全部订阅频道的文章 {link: [channel_id, ...]}
+        self.deliveries = self.storage.load("deliveries")
+        # RSS 条件请求的验证信息 {url: {"etag", "modified", "hash", "author"}}
+        self.feed_cache = self.storage.load("feed_cache")
+
+        # 按日期的排行索引 {date: [(-rp, uid), ...]}，按 RP 从大到小排好
+        self.day_index = {}
+        self.day_dates = []  # 有打卡记录的日期，升序，用于区间查询
+        self._build_day_index()
+        # 打卡数据变化时的回调 callback(uid, date_str)，例如让图表缓存失效
+        self.checkin_listeners = []
+
+    @classmethod
+    def default_files(cls, data_dir="data"):
+        names = {
+            "seen_url": "seen_url.json",
+            "seen_luogu": "seen_luogu.json",
+            "checkins": "checkins.json",
+            "deliveries": "deliveries.json",
+            "feed_cache": "feed_cache.json",
+            "poll_schedule": "poll_schedule.json",
+        }
+        return {name: os.path.join(data_dir, f) for name, f in names.items()}
+
+    def _open_storage(self, storage, db_file):
+        if storage == "json":
+            return JsonStorage(self.files, self.LIST_STORES)
+        if storage == "sqlite":
+            # 第一次切换到 SQLite 时自动导入旧的 JSON 数据
+            if not os.path.exists(db_file):
+                counts = migrate_json_to_sqlite(self.files, db_file, self.LIST_STORES)
+                print(f"Migrated JSON data to {db_file}: {counts}")
+            return SqliteStorage(db_file)
+        raise ValueError(f"Unknown storage backend: {storage}")
 
-        self.seen_urls = self._load_json(url_file, default=[])
-        self.seen_urls_set = set(self.seen_urls)
-        self.seen_luogu = self._load_json(luogu_file, default={})
-        self.checkins = self._load_json(checkin_file, default={})  # 新增：加载打卡数据
+    def start(self):
+        """在事件循环里启动后台写盘任务 (setup_hook 里调用)"""
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = asyncio.create_task(self._flush_loop())
 
-    def _load_json(self, filepath, default):
-        if not os.path.exists(filepath):
-            return default
+    def save(self):
+        """请求保存：后台任务启动后交给它合并写盘，否则直接同步写入"""
+        if self._flush_task is None:
+            self.storage.commit()
+        else:
+            self._flush_event.set()
+
+    async def flush(self):
+        """立即把所有改动写盘 (写文件在线程里进行，不阻塞事件循环)"""
+        if self._flush_lock is None:
+            self.storage.commit()
+            return
+        # 加锁保证多次写盘按顺序进行
+        async with self._flush_lock:
+            await self._wait_for_write()
+            if not self.storage.has_pending():
+                return
+            pending = self.storage.take_pending()
+            self._write_pending = pending
+            self._write_task = asyncio.ensure_future(
+                asyncio.to_thread(self.storage.write, pending)
+            )
+            await self._wait_for_write()
+
+    async def _wait_for_write(self):
+        """等写盘线程结束；被取消时只是不再等待，不会打断线程里的写盘"""
+        task = self._write_task
+        if task is None:
+            return
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
+            await asyncio.shield(task)
         except Exception:
-            return default
+            # 写盘失败 (例如 database is locked)：改动放回去，下次写盘重试
+            self.storage.restore_pending(self._write_pending)
+            raise
+        finally:
+            if task.done():
+                self._write_task = None
+                self._write_pending = None
 
-    def save(self):
-        # 原有的保存逻辑...
-        os.makedirs(os.path.dirname(self.url_file), exist_ok=True)
-        with open(self.url_file, "w", encoding="utf-8") as f:
-            json.dump(list(self.seen_urls_set), f, ensure_ascii=False, indent=2)
-        with open(self.luogu_file, "w", encoding="utf-8") as f:
-            json.dump(self.seen_luogu, f, ensure_ascii=False, indent=2)
+    async def _flush_loop(self):
+        while True:
+            await self._flush_event.wait()
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to flush data: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    async def close(self):
+        """停止后台任务，写入剩余改动 (关机时调用)
 
-        # 新增：保存打卡数据
-        with open(self.checkin_file, "w", encoding="utf-8") as f:
-            json.dump(self.checkins, f, ensure_ascii=False, indent=2)
+        后台任务被取消时可能正在写盘，flush 会先等那次写完再写剩下的改动
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        self._flush_task = None
+        self.storage.close()
 
     # --- 原有的 RSS 相关方法 ---
-    def is_url_seen(self, url):
-        return url in self.seen_urls_set
+    def is_url_seen(self, url, feed=LEGACY_NAMESPACE):
+        return self.seen.contains(url, feed)
+
+    def add_url(self, url, feed=LEGACY_NAMESPACE):
+        self.seen.add(url, feed)
 
-    def add_url(self, url):
-        self.seen_urls_set.add(url)
+    def seen_horizon(self):
+        """已读记录只保留这么久，更早的文章应当直接跳过"""
+        return self.seen.horizon()
 
-    def get_luogu_count(self, uid):
-        return self.seen_luogu.get(str(uid), 0)
+    def evict_seen(self):
+        return self.seen.evict()
 
-    def set_luogu_count(self, uid, count):
-        self.seen_luogu[str(uid)] = count
+    # --- 按频道记录文章投递情况 ---
+    def is_delivered(self, channel_id, url, feed=LEGACY_NAMESPACE):
+        """seen_url 里的文章视为已经发给所有订阅频道"""
+        if self.seen.contains(url, feed):
+            return True
+        return str(channel_id) in self.deliveries.get(url, ())
+
+    def is_seen_by_all(self, channel_ids, url, feed=LEGACY_NAMESPACE):
+        return all(self.is_delivered(ch_id, url, feed) for ch_id in channel_ids)
+
+    def mark_delivered(self, channel_id, url, subscriber_ids, feed=LEGACY_NAMESPACE):
+        """记录投递；所有订阅频道都收到后并入 seen_url，不再单独记录"""
+        if self.seen.contains(url, feed):
+            return
+        delivered = list(self.deliveries.get(url, []))
+        if str(channel_id) not in delivered:
+            delivered.append(str(channel_id))
+        if all(str(ch_id) in delivered for ch_id in subscriber_ids):
+            self.storage.delete("deliveries", (url,))
+            self.add_url(url, feed)
+        else:
+            self.storage.set("deliveries", (url,), delivered)
+
+    def get_feed_cache(self, url):
+        """返回验证信息的副本，交给爬虫线程修改后再用 set_feed_cache 写回"""
+        return dict(self.feed_cache.get(url, {}))
+
+    def set_feed_cache(self, url, cache):
+        if self.feed_cache.get(url) != cache:
+            self.storage.set("feed_cache", (url,), cache)
+
+    def _upgrade_luogu_state(self):
+        """旧版本只记了文章数 {uid: count}，转成 {uid: {"count": count}}"""
+        for uid, value in list(self.seen_luogu.items()):
+            if not isinstance(value, dict):
+                self.storage.set("seen_luogu", (uid,), {"count": value})
+
+    def get_luogu_state(self, uid):
+        return dict(self.seen_luogu.get(str(uid), {}))
+
+    def set_luogu_state(self, uid, state):
+        if self.seen_luogu.get(str(uid)) != state:
+            self.storage.set("seen_luogu", (str(uid),), state)
 
     # --- 新增：打卡相关方法 ---
+    def _build_day_index(self):
+        for uid, dates in self.checkins.items():
+            for date_str, rp in dates.items():
+                self.day_index.setdefault(date_str, []).append((-rp, uid))
+        for entries in self.day_index.values():
+            entries.sort()
+        self.day_dates = sorted(self.day_index)
+
+    def _index_checkin(self, uid, date_str, rp_value, old_rp=None):
+        if date_str not in self.day_index:
+            self.day_index[date_str] = []
+            bisect.insort(self.day_dates, date_str)
+        entries = self.day_index[date_str]
+        if old_rp is not None:
+            i = bisect.bisect_left(entries, (-old_rp, uid))
+            if i < len(entries) and entries[i] == (-old_rp, uid):
+                entries.pop(i)
+        bisect.insort(entries, (-rp_value, uid))
+
     def add_checkin(self, user_id, date_str, rp_value):
         uid = str(user_id)
-        if uid not in self.checkins:
-            self.checkins[uid] = {}
-        self.checkins[uid][date_str] = rp_value
+        old_rp = self.get_user_checkin(uid, date_str)
+        self.storage.set("checkins", (uid, date_str), rp_value)
+        self._index_checkin(uid, date_str, rp_value, old_rp)
         self.save()
+        for callback in self.checkin_listeners:
+            callback(uid, date_str)
 
     def get_user_checkin(self, user_id, date_str):
         """获取某用户某天的RP，没打卡返回 None"""
@@ -69,12 +264,27 @@ class DataManager:
         """获取用户所有历史数据"""
         return self.checkins.get(str(user_id), {})
 
-    def get_day_rank(self, date_str):
-        """获取某天所有人的数据，返回 [(uid, rp), ...]"""
-        rank = []
-        for uid, dates in self.checkins.items():
-            if date_str in dates:
-                rank.append((uid, dates[date_str]))
-        # 按 RP 从大到小排序
-        rank.sort(key=lambda x: x[1], reverse=True)
+    def get_day_rank(self, date_str, top=None):
+        """获取某天所有人的数据，返回 [(uid, rp), ...]，按 RP 从大到小排序"""
+        entries = self.day_index.get(date_str, [])
+        if top is not None:
+            entries = entries[:top]
+        return [(uid, -neg_rp) for neg_rp, uid in entries]
+
+    def get_range_rank(self, start_date, end_date, top=None):
+        """获取 [start_date, end_date] 区间内的平均 RP 排行，返回 [(uid, 平均rp, 打卡天数), ...]"""
+        lo = bisect.bisect_left(self.day_dates, start_date)
+        hi = bisect.bisect_right(self.day_dates, end_date)
+        totals = {}
+        for date_str in self.day_dates[lo:hi]:
+            for neg_rp, uid in self.day_index[date_str]:
+                total, days = totals.get(uid, (0, 0))
+                totals[uid] = (total - neg_rp, days + 1)
+        rank = [
+            (uid, round(total / days, 1), days) for uid, (total, days) in totals.items()
+        ]
+        # 平均 RP 相同时打卡天数多的在前
+        rank.sort(key=lambda x: (x[1], x[2]), reverse=True)
+        if top is not None:
+            rank = rank[:top]
         return rank
@@ -0,0 +1,100 @@
+import asyncio
+import aiohttp
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+
+class ResponseTooLarge(Exception):
+    def __init__(self, url, limit):
+        super().__init__(f"Response from {url} exceeds {limit} bytes")
+        self.url = url
+        self.limit = limit
+
+
+async def _read_capped(resp, max_bytes):
+    """边下载边计数，超过 max_bytes 立刻放弃，不会把整个大文件读进内存"""
+    if resp.content_length is not None and resp.content_length > max_bytes:
+        raise ResponseTooLarge(str(resp.url), max_bytes)
+    buf = bytearray()
+    async for chunk in resp.content.iter_chunked(64 * 1024):
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ResponseTooLarge(str(resp.url), max_bytes)
+    return bytes(buf)
+
+
+# 这些状态码值得重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """全 bot 共用的 HTTP 客户端：一个长连接 session，带超时和指数退避重试
+
+    由 MyBot 在 setup_hook 里 start()，关机时 close()
+    """
+
+    def __init__(
+        self,
+        limit=100,
+        limit_per_host=10,
+        timeout=30,
+        retries=2,
+        backoff=0.5,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def _request(self, url, read, **kwargs):
+        """GET 请求，网络错误和 RETRY_STATUS 会重试，其他非 200 状态直接抛 HttpStatusError"""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(url, **kwargs) as resp:
+                    if resp.status == 200:
+                        return await read(resp)
+                    error = HttpStatusError(resp.status, url)
+                    if resp.status not in RETRY_STATUS:
+                        raise error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2**attempt)
+        raise error
+
+    async def get_json(self, url, **kwargs):
+        # 有的接口 Content-Type 不规范，不检查
+        return await self._request(
+            url, lambda resp: resp.json(content_type=None), **kwargs
+        )
+
+    async def get_bytes(self, url, max_bytes=None, **kwargs):
+        """max_bytes 不为 None 时流式下载，超过上限抛 ResponseTooLarge (不重试)"""
+        if max_bytes is None:
+            return await self._request(url, lambda resp: resp.read(), **kwargs)
+        return await self._request(
+            url, lambda resp: _read_capped(resp, max_bytes), **kwargs
+        )
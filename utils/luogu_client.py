@@ -0,0 +1,143 @@
+import asyncio
+import cloudscraper
+from yarl import URL
+from utils.scrapers import parse_luogu_context, parse_luogu_articles
+
+LUOGU_HOST = "www.luogu.com.cn"
+LUOGU_ROOT = URL(f"https://{LUOGU_HOST}/")
+# 默认按发布时间倒序，新文章都在前几页
+ARTICLE_LIST_URL = "https://www.luogu.com.cn/user/{uid}/article?page={page}"
+
+
+class LuoguError(Exception):
+    pass
+
+
+class LuoguClient:
+    """异步洛谷爬虫：所有 uid 共用 bot 的长连接 session 和 Cloudflare 验证结果"""
+
+    def __init__(self, http_client, concurrency=4, timeout=30):
+        self.http = http_client
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # 同时请求的页面数上限
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # cloudscraper 只在遇到 Cloudflare 验证时才用，拿到的 cookie 共享给 session
+        self.scraper = None
+        self.headers = {}
+        self.clearance_lock = asyncio.Lock()
+
+    def _solve_challenge(self, url):
+        """同步通过 Cloudflare 验证，返回 (cookies, User-Agent)"""
+        if self.scraper is None:
+            self.scraper = cloudscraper.create_scraper()
+        r = self.scraper.get(url, timeout=self.timeout)
+        if r.status_code != 200:
+            raise LuoguError(f"Cloudflare challenge failed: HTTP {r.status_code}")
+        return self.scraper.cookies.get_dict(), self.scraper.headers["User-Agent"]
+
+    async def _refresh_clearance(self, url, stale_headers):
+        async with self.clearance_lock:
+            # 其他请求已经刷新过了，直接重试
+            if self.headers is not stale_headers:
+                return
+            loop = asyncio.get_running_loop()
+            cookies, user_agent = await loop.run_in_executor(
+                None, self._solve_challenge, url
+            )
+            # 按站点根目录记 cookie：只发给洛谷的所有页面，不会带到共用 session 的其他站点
+            self.http.session.cookie_jar.update_cookies(
+                cookies, response_url=LUOGU_ROOT
+            )
+            # cf_clearance 和 User-Agent 绑定，之后的请求都要带上同一个
+            self.headers = {"User-Agent": user_agent}
+
+    async def get_text(self, url):
+        async with self.semaphore:
+            for attempt in range(2):
+                headers = self.headers
+                async with self.http.session.get(url, headers=headers) as r:
+                    if r.status == 200:
+                        return await r.text()
+                    challenged = r.status in (403, 503)
+                    status = r.status
+                if not challenged or attempt:
+                    break
+                await self._refresh_clearance(url, headers)
+            raise LuoguError(f"HTTP {status} for {url}")
+
+    async def get_page(self, uid, page):
+        html = await self.get_text(ARTICLE_LIST_URL.format(uid=uid, page=page))
+        data = parse_luogu_context(html)
+        if data is None:
+            raise LuoguError(f"No lentille-context for uid {uid} page {page}")
+        return data
+
+    async def fetch_articles(self, uid, data_manager, skip_time, seen_checker):
+        """增量抓取：文章按时间倒序，从第一页往后翻，翻到上次最新的文章就停
+
+        通常只需要请求第一页。是否已读由 seen_checker 判断，标记已读交给调用方。
+        返回 (author, articles, state)，state 是新的抓取进度，调用方等所有频道
+        都收到文章后再用 set_luogu_state 保存；出错时 state 为 None
+        """
+        state = data_manager.get_luogu_state(uid)
+        last_lid = state.get("last_lid")
+        # 上次最新的文章被删了也能停下来：不晚于它发布的文章肯定都看过了
+        last_time = state.get("last_time", 0)
+        cutoff = max(skip_time, last_time)
+
+        try:
+            first = await self.get_page(uid, 1)
+
+            per_page = first["data"]["articles"]["perPage"]
+            total_count = first["data"]["articles"]["count"]
+            author_name = first["data"]["user"]["name"]
+            author = f"{author_name} 的洛谷专栏"
+
+            end_page = max(1, (total_count + per_page - 1) // per_page)
+            max_pages = end_page
+            if last_lid is None and "count" in state:
+                # 旧数据只有文章数：新文章最多 total_count - count 篇
+                new_count = max(0, total_count - state["count"])
+                max_pages = max(1, (new_count + per_page - 1) // per_page)
+            if total_count < state.get("count", 0):
+                # 有文章被删了，文章数变少不影响增量判断，不用重新全量扫描
+                print(f"Luogu {uid}: {state['count'] - total_count} articles deleted")
+
+            new_articles = []
+            data = first
+            page = 1
+            while True:
+                batch = data["data"]["articles"]["result"]
+                lids = [a["lid"] for a in batch]
+                if last_lid in lids:
+                    new_articles.extend(batch[: lids.index(last_lid)])
+                    break
+                new_articles.extend(a for a in batch if a["time"] > last_time)
+                # 这一页最早的文章已经不新了，后面的页更早
+                if not batch or batch[-1]["time"] <= cutoff or page >= max_pages:
+                    break
+                page += 1
+                data = await self.get_page(uid, page)
+
+            newest = first["data"]["articles"]["result"][:1]
+            new_state = {
+                "count": total_count,
+                "last_lid": newest[0]["lid"] if newest else last_lid,
+                "last_time": newest[0]["time"] if newest else last_time,
+            }
+
+            # 按发布时间从早到晚推送
+            new_articles.reverse()
+            page_data = {"data": {"articles": {"result": new_articles}}}
+            articles = parse_luogu_articles(page_data, seen_checker, skip_time)
+            return author, articles, new_state
+
+        except Exception as e:
+            print(f"Luogu scrape error for {uid}: {e}")
+            return "Error", [], None
+
+    async def close(self):
+        # session 属于 bot，这里只关闭 cloudscraper
+        if self.scraper is not None:
+            self.scraper.close()
@@ -0,0 +1,218 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from aiohttp import web
+
+# 直方图的桶上限 (秒)，和 Prometheus 默认的桶差不多，多了几个长任务用的
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最后一个是 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    def quantile(self, q):
+        """按桶估算分位数 (返回所在桶的上限)，落在 +Inf 桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+class Metrics:
+    """bot 的运行指标：事件循环延迟、指令耗时、定时任务耗时、各种队列长度
+
+    由 MyBot 持有，!stats 指令和 Prometheus 文本接口 (/metrics) 都从这里读
+    """
+
+    def __init__(self, lag_interval=0.5, port=None, host="127.0.0.1"):
+        self.lag_interval = lag_interval
+        self.port = port
+        self.host = host
+        # {(指标名, ((标签, 值), ...)): Histogram}
+        self.histograms = {}
+        # {(指标名, ((标签, 值), ...)): 返回当前值的函数}
+        self.gauges = {}
+        self.help = {
+            "bot_loop_lag_seconds": "Event loop scheduling delay",
+            "bot_command_seconds": "Command latency",
+            "bot_command_errors_total": "Commands that raised an error",
+            "bot_task_seconds": "Background task loop run duration",
+        }
+        self.errors = {}  # {command: 次数}
+        self.started = time.time()
+        self._lag_task = None
+        self._runner = None
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        return self.histograms[key]
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    @contextmanager
+    def time_task(self, task):
+        """记录一次定时任务的耗时，出异常也记"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("bot_task_seconds", time.perf_counter() - start, task=task)
+
+    def register_gauge(self, name, func, help_text="", **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = func
+        if help_text:
+            self.help[name] = help_text
+
+    def unregister_gauge(self, name, **labels):
+        self.gauges.pop((name, tuple(sorted(labels.items()))), None)
+
+    def command_error(self, command):
+        self.errors[command] = self.errors.get(command, 0) + 1
+
+    # --- 事件循环延迟 ---
+    async def _monitor_lag(self):
+        """每隔 lag_interval 秒醒来一次，实际多睡的时间就是事件循环被阻塞的时间"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - start - self.lag_interval)
+            self.observe("bot_loop_lag_seconds", lag)
+
+    async def start(self):
+        self._lag_task = asyncio.create_task(self._monitor_lag())
+        if self.port:
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle_metrics)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+            print(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle_metrics(self, request):
+        return web.Response(
+            text=self.render_prometheus(), content_type="text/plain", charset="utf-8"
+        )
+
+    def _gauge_values(self):
+        values = []
+        for (name, labels), func in self.gauges.items():
+            try:
+                values.append((name, labels, func()))
+            except Exception as e:
+                print(f"Failed to read gauge {name}: {e}")
+        return values
+
+    def render_prometheus(self):
+        """Prometheus 文本格式"""
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), h in sorted(self.histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            bounds = [str(b) for b in BUCKETS] + ["+Inf"]
+            for bound, n in zip(bounds, h.counts):
+                cumulative += n
+                label_str = _labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{{{label_str}}} {cumulative}")
+            suffix = f"{{{_labels(labels)}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {h.sum}")
+            lines.append(f"{name}_count{suffix} {h.count}")
+
+        header("bot_command_errors_total", "counter")
+        for command, n in sorted(self.errors.items()):
+            lines.append(f'bot_command_errors_total{{command="{command}"}} {n}')
+
+        for name, labels, value in sorted(self._gauge_values()):
+            header(name, "gauge")
+            suffix = f"{{{_labels(labels)}}}" if labels else ""
+            lines.append(f"{name}{suffix} {value}")
+
+        header("bot_uptime_seconds", "gauge")
+        lines.append(f"bot_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """给 !stats 用的纯文本摘要"""
+        lines = []
+        lag = self.histogram("bot_loop_lag_seconds")
+        lines.append(
+            f"事件循环延迟: 最近 {lag.last * 1000:.1f}ms  "
+            f"p99 {lag.quantile(0.99) * 1000:.0f}ms  最大 {lag.max * 1000:.1f}ms"
+        )
+
+        def section(title, name, label):
+            rows = [
+                (dict(labels)[label], h)
+                for (n, labels), h in sorted(self.histograms.items())
+                if n == name
+            ]
+            if not rows:
+                return
+            lines.append(title)
+            for value, h in rows:
+                extra = ""
+                if name == "bot_command_seconds" and self.errors.get(value):
+                    extra = f"  出错 {self.errors[value]}"
+                lines.append(
+                    f"  {value:<20} {h.count:>5} 次  最近 {h.last * 1000:>8.0f}ms  "
+                    f"p50 {h.quantile(0.5) * 1000:>6.0f}ms  "
+                    f"p99 {h.quantile(0.99) * 1000:>6.0f}ms  "
+                    f"最大 {h.max * 1000:>8.0f}ms{extra}"
+                )
+
+        section("指令耗时:", "bot_command_seconds", "command")
+        section("定时任务耗时:", "bot_task_seconds", "task")
+
+        gauges = self._gauge_values()
+        if gauges:
+            lines.append("队列长度:")
+            for name, labels, value in sorted(gauges):
+                label_str = ",".join(v for _, v in labels)
+                lines.append(
+                    f"  {name}{'[' + label_str + ']' if label_str else ''}: {value}"
+                )
+        return "\n".join(lines)
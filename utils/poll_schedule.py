@@ -0,0 +1,89 @@
+import random
+import statistics
+
+STORE = "poll_schedule"
+# 每个源记住最近多少篇文章的发布时间
+HISTORY = 20
+# 抓取间隔 = 发文间隔 x POLL_FRACTION，平均每篇文章之间抓 10 次
+POLL_FRACTION = 0.1
+
+
+class PollScheduler:
+    """按每个源的发文频率安排抓取时间：常更新的源抓得勤，很久不更新的源抓得少
+
+    数据结构 {namespace: {"published": [发布时间戳, ...], "next": 下次抓取时间戳}}，
+    直接存在存储后端的 poll_schedule 里，重启后接着用
+    """
+
+    def __init__(
+        self,
+        storage,
+        default_interval=1800,
+        min_interval=600,
+        max_interval=21600,
+        jitter=0.1,
+    ):
+        self.storage = storage
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.data = storage.load(STORE)
+
+    def _entry(self, key):
+        entry = self.data.get(key) or {}
+        return {
+            "published": list(entry.get("published", [])),
+            "next": entry.get("next"),
+        }
+
+    def interval(self, key, now):
+        """根据发文记录算出的抓取间隔 (秒)，不含抖动"""
+        published = self._entry(key)["published"]
+        if not published:
+            return self.default_interval
+        # 最近一次发文之后一直没动静，说明这个源变冷了，间隔跟着拉长
+        gap = now - published[-1]
+        intervals = [b - a for a, b in zip(published, published[1:]) if b > a]
+        if intervals:
+            gap = max(gap, statistics.median(intervals))
+        return min(self.max_interval, max(self.min_interval, gap * POLL_FRACTION))
+
+    def record(self, key, timestamps):
+        """记录这次抓到的文章的发布时间"""
+        timestamps = [int(ts) for ts in timestamps if ts]
+        if not timestamps:
+            return
+        entry = self._entry(key)
+        published = sorted(set(entry["published"]) | set(timestamps))[-HISTORY:]
+        if published != entry["published"]:
+            entry["published"] = published
+            self.storage.set(STORE, (key,), entry)
+
+    def schedule(self, key, now):
+        """抓完一次后安排下一次，加上随机抖动避免多个源总是挤在一起"""
+        interval = self.interval(key, now)
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        entry = self._entry(key)
+        entry["next"] = now + interval
+        self.storage.set(STORE, (key,), entry)
+        return entry["next"]
+
+    def spread(self, keys, now):
+        """启动时把没有安排过或已经过期的源均匀分布到接下来 min_interval 秒里"""
+        overdue = []
+        for key in keys:
+            entry = self._entry(key)
+            if entry["next"] is None or entry["next"] <= now:
+                overdue.append(key)
+            elif entry["next"] > now + self.max_interval:
+                # 配置改小了 max_interval
+                entry["next"] = now + self.max_interval
+                self.storage.set(STORE, (key,), entry)
+        for i, key in enumerate(overdue):
+            entry = self._entry(key)
+            entry["next"] = now + self.min_interval * i / len(overdue)
+            self.storage.set(STORE, (key,), entry)
+
+    def due(self, keys, now):
+        return [key for key in keys if (self.data.get(key) or {}).get("next", 0) <= now]
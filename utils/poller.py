@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+def get_host(url):
+    """取出 url 的域名，用于按站点限流"""
+    return urlparse(url).netloc or url
+
+
+class FeedPoller:
+    """并发抓取订阅源：全局并发上限 + 单站点并发上限 + 单源超时"""
+
+    def __init__(self, concurrency=8, per_host=2, timeout=120):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.host_semaphores = {}
+        # 爬虫专用线程池，不和其他 cog 抢默认线程池
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="feed-poller"
+        )
+
+    def _host_semaphore(self, host):
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self.host_semaphores[host]
+
+    async def run(self, host, func, *args):
+        """在线程池里执行阻塞的抓取函数，超时抛出 asyncio.TimeoutError
+
+        注意：超时后线程本身无法被打断，只是不再等待它的结果
+        """
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            async with self._host_semaphore(host):
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, func, *args),
+                    timeout=self.timeout,
+                )
+
+    async def run_async(self, host, coro_func, *args):
+        """异步抓取函数同样受并发上限和超时约束"""
+        async with self.semaphore:
+            async with self._host_semaphore(host):
+                return await asyncio.wait_for(coro_func(*args), timeout=self.timeout)
+
+    def queue_depth(self):
+        """线程池里排队等待的任务数 (不含正在执行的)"""
+        return self.executor._work_queue.qsize()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,50 @@
+import hashlib
+from collections import OrderedDict
+
+
+class RenderCache:
+    """图表 PNG 的 LRU 缓存：key 是绘图数据的哈希，超过条数或总字节数时淘汰最旧的
+
+    每条缓存可以带标签 (例如日期)，数据变化时按标签失效
+    """
+
+    def __init__(self, max_entries=32, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # {key: (png_bytes, tags)}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        item = self.entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, data, tags=()):
+        if len(data) > self.max_bytes:
+            return
+        self._remove(key)
+        self.entries[key] = (data, frozenset(tags))
+        self.total_bytes += len(data)
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def invalidate(self, *tags):
+        """删除带有任一标签的缓存"""
+        tags = set(tags)
+        for key in [k for k, (_, t) in self.entries.items() if t & tags]:
+            self._remove(key)
+
+    def _remove(self, key):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.total_bytes -= len(item[0])
@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+import json
+import os
+import time
+from utils.storage import _atomic_write_json
+
+
+class ResponseCache:
+    """JSON 接口的响应缓存：每个 url 单独设置 TTL，过期后先返回旧数据再后台刷新
+
+    fetch(url, **kwargs) 是真正发请求的协程，失败时抛异常；cache_file 不为空时缓存会写盘，
+    重启后直接使用。同一个 key 同时只会有一个请求在路上
+    """
+
+    def __init__(self, fetch, cache_file=None, max_stale=86400):
+        self.fetch = fetch
+        self.cache_file = cache_file
+        # 过期超过 max_stale 秒的数据不再返回
+        self.max_stale = max_stale
+        self.entries = {}  # {key: [过期时间戳, data]}
+        self.inflight = {}  # {key: Task}
+        # 几个接口同时刷新时按顺序写盘，避免旧快照后写完覆盖新快照
+        self.save_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"Failed to load response cache {self.cache_file}: {e}")
+
+    @staticmethod
+    def make_key(url, params=None):
+        if not params:
+            return url
+        return url + "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+
+    @staticmethod
+    def expires_at(now, ttl, tz=None):
+        """now + ttl；给了 tz 时不会超过该时区的下一个零点 (每天更新的接口)"""
+        expires = now + ttl
+        if tz is not None:
+            today = datetime.datetime.fromtimestamp(now, tz).date()
+            midnight = datetime.datetime.combine(
+                today + datetime.timedelta(days=1), datetime.time(), tz
+            )
+            expires = min(expires, midnight.timestamp())
+        return expires
+
+    async def get(self, url, ttl, params=None, tz=None, allow_stale=True):
+        """返回缓存或新请求到的数据，请求失败时抛出 fetch 的异常
+
+        allow_stale 为 True 时，刚过期的数据直接返回，同时在后台刷新
+        """
+        key = self.make_key(url, params)
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry is not None:
+            expires, data = entry
+            if now < expires:
+                self.hits += 1
+                return data
+            if allow_stale and now < expires + self.max_stale:
+                self.hits += 1
+                self._refresh(key, url, ttl, params, tz)
+                return data
+        self.misses += 1
+        return await asyncio.shield(self._refresh(key, url, ttl, params, tz))
+
+    def _refresh(self, key, url, ttl, params, tz):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._do_refresh(key, url, ttl, params, tz))
+            self.inflight[key] = task
+            # 后台刷新没人等结果，异常在这里取走，避免 "never retrieved" 警告
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _do_refresh(self, key, url, ttl, params, tz):
+        try:
+            kwargs = {"params": params} if params else {}
+            data = await self.fetch(url, **kwargs)
+            self.entries[key] = [self.expires_at(time.time(), ttl, tz), data]
+            await self._save()
+            return data
+        finally:
+            self.inflight.pop(key, None)
+
+    async def _save(self):
+        if not self.cache_file:
+            return
+        async with self.save_lock:
+            # 拿到锁之后再取快照，后写完的一定是更新的数据
+            cutoff = time.time() - self.max_stale
+            self.entries = {k: e for k, e in self.entries.items() if e[0] > cutoff}
+            snapshot = dict(self.entries)
+            try:
+                await asyncio.to_thread(_atomic_write_json, self.cache_file, snapshot)
+            except Exception as e:
+                print(f"Failed to save response cache {self.cache_file}: {e}")
+
+    def close(self):
+        for task in list(self.inflight.values()):
+            task.cancel()
@@ -1,41 +1,243 @@
 import feedparser
-import cloudscraper
+import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 from datetime import datetime, timezone, timedelta
+from io import BytesIO
+from urllib.parse import urljoin
+import calendar
+import email.utils
+import hashlib
 import json
+import re
+import time
 
 # 时区常量
 TZ_UTC8 = timezone(timedelta(hours=8))
 
+# RSS 请求超时 (秒)
+RSS_TIMEOUT = 30
+RSS_HEADERS = {"User-Agent": feedparser.USER_AGENT}
+# 流式解析时连续这么多篇已读或过期的文章，就认为后面的都是旧文章
+STREAM_STOP_RUN = 5
 
-def parse_rss(url, seen_checker, skip_time):
-    """通用 RSS 解析"""
-    feed = feedparser.parse(url)
-    author = feed.feed.get("title", "Unknown")
-    new_articles = []
 
-    for entry in feed.entries[::-1]:  # 倒序
-        link = entry.get("link")
-        if seen_checker(link):
-            continue
+def fetch_feed(url, cache):
+    """带 ETag / Last-Modified 的条件请求
+
+    cache 是这个源的验证信息 {"etag", "modified", "hash", "author"}，会被原地更新。
+    源没有变化 (304 或内容哈希相同) 时返回 None，否则返回 (内容, 响应头)
+    """
+    headers = dict(RSS_HEADERS)
+    if cache.get("etag"):
+        headers["If-None-Match"] = cache["etag"]
+    if cache.get("modified"):
+        headers["If-Modified-Since"] = cache["modified"]
+
+    r = requests.get(url, headers=headers, timeout=RSS_TIMEOUT)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+
+    cache["etag"] = r.headers.get("ETag")
+    cache["modified"] = r.headers.get("Last-Modified")
+
+    # 不支持条件请求的源，用内容哈希判断有没有变化
+    digest = hashlib.sha256(r.content).hexdigest()
+    if digest == cache.get("hash"):
+        return None
+    cache["hash"] = digest
+    return r.content, r.headers
 
-        # 处理时间 (尝试多种格式，这里简化逻辑)
-        published_raw = entry.get("published")
+
+def parse_feed_date(raw):
+    """RSS 的 RFC 822 或 Atom 的 ISO 8601 时间转成时间戳，解析不了返回 None"""
+    if not raw:
+        return None
+    raw = raw.strip()
+    try:
+        dt = email.utils.parsedate_to_datetime(raw)
+    except (TypeError, ValueError, IndexError):
         try:
-            # 针对不同 RSS 源可能需要不同解析，这里复用你原来的逻辑
-            if "T" in published_raw and "Z" in published_raw:
-                published = (
-                    datetime.strptime(published_raw, "%Y-%m-%dT%H:%M:%SZ")
-                    .replace(tzinfo=timezone.utc)
-                    .astimezone(TZ_UTC8)
-                )
+            dt = datetime.fromisoformat(raw)
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _local_name(tag):
+    # 注释、处理指令的 tag 不是字符串
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+
+def _stream_entry(elem, base_url):
+    """把一个 <item> / <entry> 转成和 feedparser 条目字段一致的 dict"""
+    fields = {}
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href is None:
+                value = child.text
+            elif child.get("rel", "alternate") == "alternate":
+                value = href
             else:
-                # 简单的容错，具体根据源调整
-                published = datetime.now(TZ_UTC8)
-        except:
-            published = datetime.now(TZ_UTC8)
+                continue
+            if value and value.strip():
+                fields.setdefault("link", urljoin(base_url, value.strip()))
+        elif name == "guid":
+            if child.get("isPermaLink", "true") != "false" and child.text:
+                fields.setdefault("guid", urljoin(base_url, child.text.strip()))
+        elif name:
+            fields.setdefault(name, "".join(child.itertext()).strip())
+
+    # 和 feedparser 一样：pubDate / issued 算 published，dc:date / modified 算 updated
+    published = fields.get("published") or fields.get("pubDate") or fields.get("issued")
+    updated = fields.get("updated") or fields.get("modified") or fields.get("date")
+    published_ts = parse_feed_date(published)
+    updated_ts = parse_feed_date(updated)
+    return {
+        "title": fields.get("title"),
+        "link": fields.get("link") or fields.get("guid"),
+        "published": published,
+        "published_parsed": time.gmtime(published_ts) if published_ts else None,
+        "updated_parsed": time.gmtime(updated_ts) if updated_ts else None,
+        "summary": fields.get("summary")
+        or fields.get("description")
+        or fields.get("content")
+        or fields.get("encoded"),
+    }
+
+
+def _entry_timestamp(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(parsed) if parsed else None
+
+
+def is_date_ordered(entries):
+    """条目是否按时间从新到旧排列，有条目没有时间也算无序"""
+    stamps = [_entry_timestamp(entry) for entry in entries]
+    if None in stamps:
+        return False
+    return all(a >= b for a, b in zip(stamps, stamps[1:]))
+
+
+def stream_feed(content, base_url, is_stale, stop_run=STREAM_STOP_RUN):
+    """用 lxml 增量解析 RSS / Atom，返回 (源标题, 按文档顺序的条目)
+
+    连续 stop_run 篇条目 is_stale 为真就不再往后解析。边解析边检查时间是否从新到旧，
+    发现乱序、条目没有时间或者 XML 不规范时返回 None，调用方应退回完整解析
+    """
+    title = None
+    entries = []
+    run = 0
+    previous = None
+    context = etree.iterparse(
+        BytesIO(content), events=("end",), resolve_entities=False, no_network=True
+    )
+    try:
+        for _, elem in context:
+            name = _local_name(elem.tag)
+            if name == "title" and title is None:
+                parent = elem.getparent()
+                if parent is not None and _local_name(parent.tag) in (
+                    "channel",
+                    "feed",
+                ):
+                    title = "".join(elem.itertext()).strip()
+                continue
+            if name not in ("item", "entry"):
+                continue
+
+            entry = _stream_entry(elem, base_url)
+            # 已经处理过的条目不再需要，释放内存
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+            timestamp = _entry_timestamp(entry)
+            if timestamp is None or (previous is not None and timestamp > previous):
+                return None
+            previous = timestamp
+            entries.append(entry)
+
+            run = run + 1 if is_stale(entry) else 0
+            if run >= stop_run:
+                break
+    except etree.XMLSyntaxError:
+        return None
+    return title, entries
+
+
+def _published_time(entry):
+    """返回 (显示用的发布时间, 发布时间戳)
+
+    时间戳来自 feedparser / 流式解析得到的真实时间，给 skip_time 判断和抓取调度用；
+    源里没有能解析的时间时为 None，显示时间按现在算
+    """
+    timestamp = _entry_timestamp(entry)
+    if timestamp is None:
+        return datetime.now(TZ_UTC8), None
+    return datetime.fromtimestamp(timestamp, TZ_UTC8), timestamp
+
+
+def _is_expired(timestamp, skip_time):
+    # 已读记录过期后靠这个判断挡住旧文章，只能用真实的发布时间
+    return timestamp is not None and timestamp < skip_time
 
-        if published.timestamp() < skip_time:
+
+def parse_rss(url, seen_checker, skip_time, cache=None, streaming=True):
+    """通用 RSS 解析，传入 cache 时源没有变化直接跳过 XML 解析
+
+    streaming 为真时增量解析，遇到连续几篇已读或过期的文章就停止；
+    上次完整解析发现不是按时间倒序的源 (cache["ordered"] 为假) 直接完整解析
+    """
+    if cache is None:
+        cache = {}
+    fetched = fetch_feed(url, cache)
+    if fetched is None:
+        return cache.get("author", "Unknown"), []
+
+    content, headers = fetched
+
+    def is_stale(entry):
+        # 没有链接的条目反正会被跳过
+        link = entry.get("link")
+        if not link or seen_checker(link):
+            return True
+        return _is_expired(_entry_timestamp(entry), skip_time)
+
+    streamed = None
+    if streaming and cache.get("ordered", True):
+        streamed = stream_feed(content, url, is_stale)
+    if streamed is not None:
+        author, entries = streamed
+        author = author or "Unknown"
+    else:
+        feed = feedparser.parse(
+            content,
+            response_headers={
+                "content-location": url,
+                "content-type": headers.get("Content-Type", ""),
+            },
+        )
+        author = feed.feed.get("title", "Unknown")
+        entries = feed.entries
+        # 乱序的源以后都完整解析，直到它重新变成按时间倒序
+        cache["ordered"] = is_date_ordered(entries)
+    cache["author"] = author
+    new_articles = []
+
+    for entry in entries[::-1]:  # 倒序
+        link = entry.get("link")
+        # 没有链接的条目没法判断是否已读，也没法点开，直接跳过
+        if not link or seen_checker(link):
+            continue
+
+        published, timestamp = _published_time(entry)
+        if _is_expired(timestamp, skip_time):
             continue
 
         summary = (entry.get("summary") or "")[:100] + "..."
@@ -44,78 +246,73 @@ def parse_rss(url, seen_checker, skip_time):
                 "title": entry.get("title"),
                 "link": link,
                 "time": published.strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": timestamp,
                 "summary": summary,
             }
         )
     return author, new_articles
 
 
-def parse_luogu(uid, data_manager, skip_time):
-    """洛谷解析逻辑"""
-    result_articles = []
-    scraper = cloudscraper.create_scraper()
+# 洛谷页面的数据都在 <script id="lentille-context"> 里
+LENTILLE_OPEN_RE = re.compile(
+    r"<script\b[^>]*\bid\s*=\s*[\"']?lentille-context[\"']?[^>]*>", re.IGNORECASE
+)
+
 
-    last_seen_count = data_manager.get_luogu_count(uid)
-    start_page = last_seen_count // 10 + 1
+def extract_lentille_context(html):
+    """直接定位 lentille-context 标签取出 JSON，不构建整棵 HTML 树
 
-    first_url = f"https://www.luogu.com.cn/user/{uid}/article?page=1&ascending=true"
+    找不到标签或 JSON 不完整时返回 None
+    """
+    m = LENTILLE_OPEN_RE.search(html)
+    if not m:
+        return None
+    end = html.find("</script>", m.end())
+    if end == -1:
+        return None
     try:
-        r = scraper.get(first_url)
-        if r.status_code != 200:
-            return "Luogu Error", []
-
-        soup = BeautifulSoup(r.text, "html.parser")
-        script_tag = soup.find("script", id="lentille-context")
-        if not script_tag:
-            return "Luogu Error", []
-
-        data = json.loads(script_tag.string)
-
-        per_page = data["data"]["articles"]["perPage"]
-        total_count = data["data"]["articles"]["count"]
-        author_name = data["data"]["user"]["name"]
-
-        # 更新计数
-        data_manager.set_luogu_count(uid, total_count)
-
-        if total_count == last_seen_count:
-            return f"{author_name} 的洛谷专栏", []
-
-        end_page = (total_count + per_page - 1) // per_page
-
-        # 翻页爬取
-        for page in range(start_page, end_page + 1):
-            url = f"https://www.luogu.com.cn/user/{uid}/article?page={page}&ascending=true"
-            r = scraper.get(url)
-            data = json.loads(
-                BeautifulSoup(r.text, "html.parser")
-                .find("script", id="lentille-context")
-                .string
-            )
-
-            for a in data["data"]["articles"]["result"]:
-                link = f"https://www.luogu.com.cn/article/{a['lid']}"
-                if data_manager.is_url_seen(link):
-                    continue
-
-                # 标记为已读
-                data_manager.add_url(link)
-
-                pub_time = datetime.fromtimestamp(a["time"], tz=TZ_UTC8)
-                if pub_time.timestamp() < skip_time:
-                    continue
-
-                result_articles.append(
-                    {
-                        "title": a["title"],
-                        "link": link,
-                        "time": pub_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "summary": a["content"][:100],
-                    }
-                )
-
-        return f"{author_name} 的洛谷专栏", result_articles
-
-    except Exception as e:
-        print(f"Luogu scrape error for {uid}: {e}")
-        return "Error", []
+        return json.loads(html[m.end() : end])
+    except ValueError:
+        return None
+
+
+def parse_luogu_context(html):
+    """从洛谷页面中取出 lentille-context 里的 JSON，取不到返回 None"""
+    data = extract_lentille_context(html)
+    if data is not None:
+        return data
+
+    # 页面结构变了，退回完整的 HTML 解析
+    return parse_luogu_context_soup(html)
+
+
+def parse_luogu_context_soup(html):
+    soup = BeautifulSoup(html, "html.parser")
+    script_tag = soup.find("script", id="lentille-context")
+    if not script_tag:
+        return None
+    return json.loads(script_tag.string)
+
+
+def parse_luogu_articles(data, seen_checker, skip_time):
+    """从一页洛谷文章列表里挑出新文章"""
+    result_articles = []
+    for a in data["data"]["articles"]["result"]:
+        link = f"https://www.luogu.com.cn/article/{a['lid']}"
+        if seen_checker(link):
+            continue
+
+        pub_time = datetime.fromtimestamp(a["time"], tz=TZ_UTC8)
+        if pub_time.timestamp() < skip_time:
+            continue
+
+        result_articles.append(
+            {
+                "title": a["title"],
+                "link": link,
+                "time": pub_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": a["time"],
+                "summary": a["content"][:100],
+            }
+        )
+    return result_articles
@@ -0,0 +1,87 @@
+import hashlib
+import time
+
+STORE = "seen_url"
+# 旧版本没有按订阅源区分的记录都放在这个命名空间
+LEGACY_NAMESPACE = ""
+
+
+def url_digest(url):
+    """64 位摘要，比完整 url 省空间，碰撞概率可以忽略"""
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SeenStore:
+    """已读文章记录：按订阅源分命名空间，记录首次出现时间，按 TTL 和数量淘汰
+
+    数据结构 {namespace: {url 或摘要: 首次出现的时间戳}}，直接存在存储后端的 seen_url 里
+    """
+
+    def __init__(self, storage, ttl_days=180, max_per_feed=1000, hashed=False):
+        self.storage = storage
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_per_feed = max_per_feed
+        self.hashed = hashed
+        self.data = storage.load(STORE)
+        self._upgrade_legacy()
+
+    def _upgrade_legacy(self):
+        """旧格式 {url: True} 转成 {"": {url: 时间戳}}，时间戳按现在算"""
+        legacy = [
+            key for key, value in self.data.items() if not isinstance(value, dict)
+        ]
+        if not legacy:
+            return
+        now = int(time.time())
+        for url in legacy:
+            self.storage.delete(STORE, (url,))
+            self.storage.set(STORE, (LEGACY_NAMESPACE, self._key(url)), now)
+
+    def _key(self, url):
+        return url_digest(url) if self.hashed else url
+
+    def contains(self, url, namespace=LEGACY_NAMESPACE):
+        # 没有链接的条目不可能被记录过
+        if not url:
+            return False
+        keys = (url, url_digest(url))
+        for ns in (namespace, LEGACY_NAMESPACE):
+            entries = self.data.get(ns)
+            if entries and any(key in entries for key in keys):
+                return True
+        return False
+
+    def add(self, url, namespace=LEGACY_NAMESPACE):
+        if not self.contains(url, namespace):
+            self.storage.set(STORE, (namespace, self._key(url)), int(time.time()))
+
+    def horizon(self):
+        """早于这个时间的文章可能已经被淘汰，调用方应直接跳过"""
+        if self.ttl is None:
+            return 0
+        return int(time.time()) - self.ttl
+
+    def evict(self):
+        """删除过期记录，每个命名空间最多保留 max_per_feed 条，返回删除数量"""
+        cutoff = self.horizon()
+        removed = 0
+        for namespace, entries in list(self.data.items()):
+            expired = [key for key, ts in entries.items() if ts < cutoff]
+            # 旧记录没有所属订阅源，只按 TTL 淘汰
+            if self.max_per_feed and namespace != LEGACY_NAMESPACE:
+                overflow = len(entries) - len(expired) - self.max_per_feed
+                if overflow > 0:
+                    alive = sorted(
+                        (ts, key) for key, ts in entries.items() if ts >= cutoff
+                    )
+                    expired.extend(key for _, key in alive[:overflow])
+            if len(expired) == len(entries):
+                self.storage.delete(STORE, (namespace,))
+            else:
+                for key in expired:
+                    self.storage.delete(STORE, (namespace, key))
+            removed += len(expired)
+        return removed
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.data.values())
@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import time
+from discord.ext import commands
+
+# 优先级，数字越小越先发
+INTERACTIVE = 0  # 指令回复
+NORMAL = 1  # 每日推送、上线报告等
+BULK = 2  # 订阅文章
+
+# Discord 单条消息最多 10 个 embed，所有 embed 加起来最多 6000 字符
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个，最多攒 capacity 个"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """还要等多少秒才有令牌，0 表示现在就有"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Message:
+    __slots__ = ("priority", "seq", "channel_id", "send", "embeds", "futures")
+
+    def __init__(self, priority, seq, channel_id, send, embeds=None):
+        self.priority = priority
+        self.seq = seq
+        self.channel_id = channel_id
+        self.send = send  # 调用后返回发送协程
+        self.embeds = embeds  # 可以合并的纯 embed 消息才有
+        self.futures = []
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def can_merge(self, embeds):
+        if self.embeds is None or len(self.embeds) + len(embeds) > MAX_EMBEDS:
+            return False
+        chars = sum(len(e) for e in self.embeds) + sum(len(e) for e in embeds)
+        return chars <= MAX_EMBED_CHARS
+
+
+class SendQueue:
+    """统一的消息发送队列：全局和每个频道各一个令牌桶，按优先级发送
+
+    同一频道同时只有一条消息在发送，保证顺序；指令回复会插到订阅文章前面。
+    coalesce=True 的纯 embed 消息排队时会和同频道排队中的消息合并成一条 (最多 10 个 embed)
+    """
+
+    def __init__(self, global_rate=40, channel_rate=1, channel_burst=5):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.channel_buckets = {}
+        self.pending = {}  # {channel_id: [_Message 小根堆]}
+        self.busy = set()  # 正在发送的频道
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.worker = None
+        self.tasks = set()  # 正在发送的任务，保持引用
+
+    def depth(self):
+        """排队中的消息数"""
+        return sum(len(heap) for heap in self.pending.values())
+
+    def start(self):
+        self.worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        for heap in self.pending.values():
+            for msg in heap:
+                for future in msg.futures:
+                    future.cancel()
+        self.pending.clear()
+
+    async def submit(self, channel_id, send, priority=NORMAL):
+        """排队执行 send() (返回发送协程的函数)，返回发出的消息，发送失败时抛出原异常"""
+        msg = _Message(priority, next(self.counter), channel_id, send)
+        return await self._enqueue(msg)
+
+    async def send(self, channel, priority=BULK, coalesce=False, **kwargs):
+        """排队调用 channel.send(**kwargs)"""
+        embeds = None
+        if coalesce and set(kwargs) <= {"embed", "embeds"}:
+            embeds = list(kwargs.get("embeds") or [kwargs["embed"]])
+            for msg in self.pending.get(channel.id, ()):
+                if msg.priority == priority and msg.can_merge(embeds):
+                    msg.embeds.extend(embeds)
+                    future = asyncio.get_running_loop().create_future()
+                    msg.futures.append(future)
+                    return await future
+        if embeds is not None:
+            msg = _Message(priority, next(self.counter), channel.id, None, embeds)
+            msg.send = lambda: channel.send(embeds=msg.embeds)
+        else:
+            msg = _Message(
+                priority, next(self.counter), channel.id, lambda: channel.send(**kwargs)
+            )
+        return await self._enqueue(msg)
+
+    async def _enqueue(self, msg):
+        future = asyncio.get_running_loop().create_future()
+        msg.futures.append(future)
+        heapq.heappush(self.pending.setdefault(msg.channel_id, []), msg)
+        self.wakeup.set()
+        return await future
+
+    def _channel_bucket(self, channel_id):
+        bucket = self.channel_buckets.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(self.channel_rate, self.channel_burst)
+            self.channel_buckets[channel_id] = bucket
+        return bucket
+
+    def _next(self):
+        """返回 (现在可以发的消息, None) 或 (None, 需要等待的秒数，None 表示等新消息)"""
+        now = time.monotonic()
+        delay = self.global_bucket.delay(now)
+        if delay:
+            return None, delay
+        best = None
+        wait = None
+        for channel_id, heap in self.pending.items():
+            if channel_id in self.busy:
+                continue
+            delay = self._channel_bucket(channel_id).delay(now)
+            if delay:
+                wait = delay if wait is None else min(wait, delay)
+            elif best is None or heap[0] < best:
+                best = heap[0]
+        return best, wait
+
+    async def _run(self):
+        while True:
+            msg, wait = self._next()
+            if msg is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heap = self.pending[msg.channel_id]
+            heapq.heappop(heap)
+            if not heap:
+                del self.pending[msg.channel_id]
+            self.global_bucket.take()
+            self._channel_bucket(msg.channel_id).take()
+            self.busy.add(msg.channel_id)
+            task = asyncio.create_task(self._dispatch(msg))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _dispatch(self, msg):
+        try:
+            result = await msg.send()
+        except Exception as e:
+            for future in msg.futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in msg.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.busy.discard(msg.channel_id)
+            self.wakeup.set()
+
+
+class QueuedContext(commands.Context):
+    """指令的 ctx.send / ctx.reply 走发送队列，优先级最高"""
+
+    async def send(self, *args, **kwargs):
+        queue = getattr(self.bot, "send_queue", None)
+        if queue is None or self.interaction is not None:
+            return await super().send(*args, **kwargs)
+        return await queue.submit(
+            self.channel.id,
+            lambda: super(QueuedContext, self).send(*args, **kwargs),
+            INTERACTIVE,
+        )
@@ -0,0 +1,155 @@
+import asyncio
+from collections import deque
+from io import BytesIO
+from utils.http_client import HttpStatusError, ResponseTooLarge
+
+SETU_API = "https://api.lolicon.app/setu/v2"
+# 先试原图，太大再试 1200px 的 regular
+IMAGE_SIZES = ("original", "regular")
+
+
+def shrink_image(data, max_bytes, max_tries=6):
+    """把图片重新编码成 JPEG，每次缩小到 3/4，直到不超过 max_bytes
+
+    CPU 密集，在线程里调用 (Pillow 编解码时会释放 GIL)
+    """
+    from PIL import Image
+
+    img = Image.open(BytesIO(data)).convert("RGB")
+    for _ in range(max_tries):
+        out = BytesIO()
+        img.save(out, "JPEG", quality=85, optimize=True)
+        if out.tell() <= max_bytes:
+            return out.getvalue()
+        width, height = img.size
+        img = img.resize((width * 3 // 4, height * 3 // 4), Image.LANCZOS)
+    raise ValueError(f"Cannot shrink image below {max_bytes} bytes")
+
+
+class SetuError(Exception):
+    """可以直接回复给用户的错误信息"""
+
+
+class SetuBuffer:
+    """按 r18 模式预先准备好几张图 (API 结果 + 图片内容)，命令直接从缓冲区取
+
+    取走之后在后台补充；所有模式共用一个内存上限，超出时从图多的模式里淘汰最旧的
+    """
+
+    def __init__(
+        self,
+        http_client,
+        size=3,
+        max_bytes=32 * 1024 * 1024,
+        upload_bytes=8 * 1024 * 1024,
+        download_bytes=20 * 1024 * 1024,
+    ):
+        self.http = http_client
+        self.size = size
+        self.max_bytes = max_bytes
+        # 上传给 Discord 的图片大小上限
+        self.upload_bytes = upload_bytes
+        # 所有尺寸都太大时，下载下来压缩的那张图的大小上限
+        self.download_bytes = download_bytes
+        self.queues = {}  # {r18_mode: deque[(img_data, image_bytes)]}
+        self.total_bytes = 0
+        self.refill_tasks = {}
+
+    async def fetch(self, r18_mode):
+        """请求 API 并下载图片，返回 (img_data, image_bytes)，失败抛 SetuError"""
+        # aiType = 1 无 AI；size 可以重复，同时要原图和 regular 两种链接
+        params = [("r18", r18_mode), ("aiType", 1)]
+        params += [("size", size) for size in IMAGE_SIZES]
+        try:
+            data = await self.http.get_json(SETU_API, params=params)
+        except HttpStatusError as e:
+            raise SetuError(f"API 请求失败: {e.status}")
+        except Exception as e:
+            raise SetuError(f"网络错误: {e}")
+
+        if data.get("error"):
+            raise SetuError(f"API 返回错误: {data['error']}")
+        if not data.get("data"):
+            raise SetuError("没找到图，换个姿势试试？")
+
+        img_data = data["data"][0]
+        # API 默认返回的是 i.pixiv.re 的代理链接
+        urls = [
+            img_data["urls"][size] for size in IMAGE_SIZES if size in img_data["urls"]
+        ]
+        for url in urls:
+            try:
+                return img_data, await self._download(url, self.upload_bytes)
+            except ResponseTooLarge:
+                continue
+
+        # 都超过上传上限：下载最小的那张，在线程里压缩
+        try:
+            image_bytes = await self._download(urls[-1], self.download_bytes)
+            image_bytes = await asyncio.to_thread(
+                shrink_image, image_bytes, self.upload_bytes
+            )
+        except (ResponseTooLarge, ValueError, OSError):
+            raise SetuError("图片太大了，换一张试试？")
+        return img_data, image_bytes
+
+    async def _download(self, url, max_bytes):
+        """流式下载，超过 max_bytes 抛 ResponseTooLarge，其他错误转成 SetuError"""
+        try:
+            return await self.http.get_bytes(url, max_bytes=max_bytes)
+        except ResponseTooLarge:
+            raise
+        except HttpStatusError:
+            raise SetuError("图片加载失败")
+        except Exception:
+            raise SetuError("下载出错，请重试")
+
+    def pop(self, r18_mode):
+        """取一张准备好的图，没有返回 None；顺便在后台补充"""
+        queue = self.queues.get(r18_mode)
+        item = queue.popleft() if queue else None
+        if item is not None:
+            self.total_bytes -= len(item[1])
+        self.refill(r18_mode)
+        return item
+
+    def refill(self, r18_mode):
+        task = self.refill_tasks.get(r18_mode)
+        if task is None or task.done():
+            self.refill_tasks[r18_mode] = asyncio.create_task(self._refill(r18_mode))
+
+    async def _refill(self, r18_mode):
+        queue = self.queues.setdefault(r18_mode, deque())
+        while len(queue) < self.size:
+            try:
+                item = await self.fetch(r18_mode)
+            except SetuError as e:
+                # 失败就先不补了，下次取图时再试
+                print(f"Setu prefetch failed (r18={r18_mode}): {e}")
+                return
+            if not self._make_room(len(item[1]), r18_mode):
+                return
+            queue.append(item)
+            self.total_bytes += len(item[1])
+
+    def _make_room(self, nbytes, r18_mode):
+        """腾出 nbytes 空间，从图多的模式里淘汰最旧的，腾不出来返回 False"""
+        if nbytes > self.max_bytes:
+            return False
+        while self.total_bytes + nbytes > self.max_bytes:
+            # 只从比自己图多的模式里淘汰，否则几个模式会互相挤占、一直重复下载
+            own = len(self.queues.get(r18_mode, ()))
+            others = [
+                q
+                for mode, q in self.queues.items()
+                if mode != r18_mode and len(q) > own + 1
+            ]
+            if not others:
+                return False
+            _, image_bytes = max(others, key=len).popleft()
+            self.total_bytes -= len(image_bytes)
+        return True
+
+    def close(self):
+        for task in self.refill_tasks.values():
+            task.cancel()
@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# 每个存储的嵌套层数，迁移时按这个展开成一条条记录
+# checkins: {uid: {date: rp}}，seen_url: {namespace: {url: 时间戳}}，其余都是 {key: value}
+STORE_DEPTH = {"checkins": 2, "seen_url": 2}
+
+
+def _set_path(obj, path, value):
+    for key in path[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[path[-1]] = value
+
+
+def _pop_path(obj, path):
+    for key in path[:-1]:
+        obj = obj.get(key)
+        if not isinstance(obj, dict):
+            return
+    obj.pop(path[-1], None)
+
+
+def _atomic_write_json(filepath, obj):
+    """先写临时文件再 rename，中途崩溃也不会留下半截 JSON
+
+    临时文件名带上进程和线程 id，同时有两次写入也不会写到同一个临时文件里
+    """
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _flatten(obj, depth, prefix=()):
+    """{a: {b: v}} -> [((a, b), v)]"""
+    if depth == 0 or not isinstance(obj, dict):
+        yield prefix, obj
+        return
+    for key, value in obj.items():
+        yield from _flatten(value, depth - 1, prefix + (key,))
+
+
+class JsonStorage:
+    """每个存储一个 JSON 文件，commit 时只重写改动过的文件
+
+    交给写盘线程的快照只浅拷贝第一层，嵌套的 dict 和实时数据共用；
+    之后 set / delete 要改到共用的 dict 时先换成副本 (写时复制)
+    """
+
+    def __init__(self, files, list_stores=()):
+        self.files = files  # {name: path}
+        # 旧版本存成列表的存储 (例如 seen_url)，读取时转换成 {item: True}
+        self.list_stores = set(list_stores)
+        self.data = {}
+        self.dirty = set()
+        # {name: 上次快照之后已经复制过的嵌套 dict 路径}，没有快照过的存储不在里面
+        self.owned = {}
+
+    def load(self, name):
+        if name not in self.data:
+            obj = self._read(self.files[name])
+            if name in self.list_stores and isinstance(obj, list):
+                obj = dict.fromkeys(obj, True)
+            self.data[name] = obj if isinstance(obj, dict) else {}
+        return self.data[name]
+
+    def _read(self, filepath):
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _own_path(self, name, path):
+        """把 path 上还和快照共用的嵌套 dict 换成副本，之后可以原地修改"""
+        owned = self.owned.get(name)
+        if owned is None:
+            return
+        obj = self.data[name]
+        for i, key in enumerate(path):
+            child = obj.get(key)
+            if not isinstance(child, dict):
+                return
+            prefix = tuple(path[: i + 1])
+            if prefix not in owned:
+                child = obj[key] = dict(child)
+                owned.add(prefix)
+            obj = child
+
+    def set(self, name, path, value):
+        obj = self.load(name)
+        self._own_path(name, path[:-1])
+        _set_path(obj, path, value)
+        self.dirty.add(name)
+
+    def delete(self, name, path):
+        obj = self.load(name)
+        self._own_path(name, path[:-1])
+        _pop_path(obj, path)
+        self.dirty.add(name)
+
+    def has_pending(self):
+        return bool(self.dirty)
+
+    def take_pending(self):
+        """在事件循环里调用：给改动过的存储做快照，之后可以在线程里 write
+
+        只复制第一层，耗时和第一层的 key 数量成正比，不用整棵拷贝
+        """
+        pending = {}
+        for name in self.dirty:
+            pending[name] = dict(self.data[name])
+            self.owned[name] = set()
+        self.dirty.clear()
+        return pending
+
+    def restore_pending(self, pending):
+        """write 失败时在事件循环里调用：这些存储下次重新写"""
+        self.dirty.update(pending)
+
+    def write(self, pending):
+        """可以在线程里调用"""
+        for name, obj in pending.items():
+            _atomic_write_json(self.files[name], obj)
+
+    def commit(self):
+        pending = self.take_pending()
+        try:
+            self.write(pending)
+        except Exception:
+            self.restore_pending(pending)
+            raise
+
+    def close(self):
+        self.commit()
+
+
+class SqliteStorage:
+    """SQLite (WAL 模式) 存储，每次改动只写一行，不再整文件重写
+
+    所有存储共用一张表，key 是 JSON 编码的路径，例如 checkins 的 ["uid", "2026-01-01"]
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " store TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (store, path))"
+        )
+        self.conn.commit()
+        self.data = {}
+        self.pending = []  # [(sql, params), ...] 等 commit 时一起写
+
+    def load(self, name):
+        if name not in self.data:
+            obj = {}
+            rows = self.conn.execute(
+                "SELECT path, value FROM kv WHERE store = ?", (name,)
+            )
+            for path, value in rows:
+                _set_path(obj, json.loads(path), json.loads(value))
+            self.data[name] = obj
+        return self.data[name]
+
+    def _encode_path(self, path):
+        return json.dumps([str(key) for key in path], ensure_ascii=False)
+
+    def set(self, name, path, value):
+        _set_path(self.load(name), path, value)
+        self.pending.append(
+            (
+                "INSERT OR REPLACE INTO kv (store, path, value) VALUES (?, ?, ?)",
+                (name, self._encode_path(path), json.dumps(value, ensure_ascii=False)),
+            )
+        )
+
+    def delete(self, name, path):
+        _pop_path(self.load(name), path)
+        encoded = self._encode_path(path)
+        # 同时删掉这个路径下面的所有记录
+        prefix = encoded[:-1] + ","
+        self.pending.append(
+            (
+                "DELETE FROM kv WHERE store = ? AND"
+                " (path = ? OR substr(path, 1, ?) = ?)",
+                (name, encoded, len(prefix), prefix),
+            )
+        )
+
+    def put_many(self, name, items):
+        """批量写入 [(path, value), ...]，用于迁移"""
+        for path, value in items:
+            self.set(name, path, value)
+
+    def has_pending(self):
+        return bool(self.pending)
+
+    def take_pending(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+    def restore_pending(self, pending):
+        """write 失败时在事件循环里调用：放回队首，保持和之后改动的先后顺序"""
+        self.pending = pending + self.pending
+
+    def write(self, pending):
+        """可以在线程里调用，连接只在这里和启动加载时使用"""
+        if not pending:
+            return
+        with self.conn:
+            for sql, params in pending:
+                self.conn.execute(sql, params)
+
+    def commit(self):
+        pending = self.take_pending()
+        try:
+            self.write(pending)
+        except Exception:
+            self.restore_pending(pending)
+            raise
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def migrate_json_to_sqlite(files, db_file, list_stores=()):
+    """一次性把现有的 JSON 文件导入 SQLite，返回每个存储导入的记录数"""
+    source = JsonStorage(files, list_stores)
+    target = SqliteStorage(db_file)
+    counts = {}
+    try:
+        for name in files:
+            items = list(_flatten(source.load(name), STORE_DEPTH.get(name, 1)))
+            target.put_many(name, items)
+            counts[name] = len(items)
+        target.commit()
+    finally:
+        target.close()
+    return counts
+
+
+if __name__ == "__main__":
+    # python -m utils.storage [data_dir] [db_file]
+    from utils.data_manager import DataManager
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    db_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, "bot.db")
+    files = DataManager.default_files(data_dir)
+    counts = migrate_json_to_sqlite(files, db_file, DataManager.LIST_STORES)
+    for name, count in counts.items():
+        print(f"{name}: {count} records")
+    print(f"Migrated to {db_file}")
@@ -0,0 +1,58 @@
+RSS_TYPES = ["cnblogs", "cyx_blogs"]
+
+
+class Subscription:
+    """一个唯一的订阅源 (rss url 或洛谷 uid) 以及订阅它的所有频道"""
+
+    def __init__(self, feed_type, source):
+        self.feed_type = feed_type
+        self.source = source
+        self.subscribers = []  # [(channel_id, follow_info), ...]
+
+    @property
+    def key(self):
+        return source_key(self.feed_type, self.source)
+
+    @property
+    def namespace(self):
+        """已读记录的命名空间，例如 rss:https://... 或 luogu:123"""
+        kind, source = self.key
+        return f"{kind}:{source}"
+
+    @property
+    def channel_ids(self):
+        return [ch_id for ch_id, _ in self.subscribers]
+
+    def add_subscriber(self, channel_id, follow_info):
+        if channel_id not in self.channel_ids:
+            self.subscribers.append((channel_id, follow_info))
+
+
+def source_key(feed_type, source):
+    """同一个源只抓一次：cnblogs / cyx_blogs 都是普通 rss，按 url 去重"""
+    if feed_type == "luogu":
+        return ("luogu", str(source))
+    return ("rss", str(source).strip())
+
+
+def iter_sources(follow_info):
+    feed_type = follow_info["type"]
+    if feed_type == "luogu":
+        return follow_info.get("uid", [])
+    if feed_type in RSS_TYPES:
+        return follow_info.get("url", [])
+    return []
+
+
+def build_subscription_index(channels):
+    """根据频道配置 (ChannelConfig) 构建 {源: Subscription}，保持配置文件里的顺序"""
+    index = {}
+    for ch_conf in channels:
+        ch_id = ch_conf.id
+        for follow in ch_conf.follow_articles:
+            for source in iter_sources(follow):
+                key = source_key(follow["type"], source)
+                if key not in index:
+                    index[key] = Subscription(follow["type"], source)
+                index[key].add_subscriber(ch_id, follow)
+    return index